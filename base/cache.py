@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+On-disk cache shared by the modules that precompute data (fuzzy lookup
+tables, traffic profiles...). Files are stored in the cache_directory
+parameter of dash_client.json, named by a hash of the key that describes
+their content, so a change in any parameter yields a new file.
+
+The files are written through write_file(): a temporary file of its own,
+renamed once complete, so the sessions running at the same time (processes
+or threads of a process) never read a partial file.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+from base.configuration_parser import ConfigurationParser
+
+
+def cache_key(key):
+    """
+    Returns a stable hash of a JSON serializable key.
+    """
+    encoded = json.dumps(key, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def cache_file(namespace, key, extension, config_parser=None):
+    """
+    Returns the path of the cache file of a key inside a namespace
+    directory, creating the directory if needed.
+    """
+    config_parser = config_parser or ConfigurationParser.get_instance()
+    directory = os.path.join(config_parser.get_parameter('cache_directory'), namespace)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{cache_key(key)}.{extension}')
+
+
+@contextlib.contextmanager
+def write_file(path):
+    """
+    Opens (binary) a temporary file in the directory of path, renamed to
+    path when the block ends without an exception, or removed otherwise.
+    """
+    f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', prefix=f'{os.path.basename(path)}.',
+                                    suffix='.tmp', delete=False)
+    try:
+        with f:
+            yield f
+        os.replace(f.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(f.name)
+        raise
@@ -3,6 +3,10 @@
 @author: Marcos F. Caetano (mfcaetano@unb.br) 11/03/2020
 
 @description: PyDash Project
+
+get_instance() returns the configuration of dash_client.json shared by the
+process. A session with its own configuration creates a ConfigurationParser
+of its parameters (see SessionContext).
 """
 import json
 
@@ -13,17 +17,21 @@ class ConfigurationParser():
     @staticmethod
     def get_instance():
         if ConfigurationParser.__instance is None:
-            ConfigurationParser()
+            ConfigurationParser.__instance = ConfigurationParser()
         return ConfigurationParser.__instance
 
-    def __init__(self):
-        if ConfigurationParser.__instance is not None:
-            raise Exception('This class is a singleton!')
-        else:
-            with open('dash_client.json') as f:
-                self.config_parameters = json.load(f)
+    def __init__(self, parameters=None, file_name='dash_client.json'):
+        """
+        parameters: configuration of the session, read from file_name if None
+        """
+        if parameters is None:
+            with open(file_name) as f:
+                parameters = json.load(f)
 
-            ConfigurationParser.__instance = self
+        self.config_parameters = dict(parameters)
 
     def get_parameter(self, key):
         return self.config_parameters[key]
+
+    def set_parameter(self, key, value):
+        self.config_parameters[key] = value
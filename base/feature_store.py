@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Features derived from the playback, published by the Player through the
+whiteboard (get_features()), so the R2A algorithms read them in O(1)
+instead of scanning the histories on every decision:
+    throughput   - last measurement, EWMA and the arithmetic and harmonic
+                   means of the last feature_throughput_window segments
+    buffer level - last level, difference between the last two levels and
+                   slope (s of video per s) between the last two times
+    stalls       - number and total duration, the current one included
+    switches     - number of changes of the played QI
+
+The Player updates the store as the events happen, each update is O(1).
+The throughput features are estimators of r2a/estimators.py.
+"""
+
+from r2a.estimators import Ewma, WindowMean
+
+
+class FeatureStore:
+
+    def __init__(self, throughput_window=5, throughput_ewma_weight=0.8):
+        """
+        throughput_window:      segments of the sliding window means
+        throughput_ewma_weight: weight of the newest throughput in the EWMA
+        """
+        self.throughput_window = WindowMean(size=throughput_window)
+        self.throughput_ewma = Ewma(throughput_ewma_weight)
+
+        self.buffer_level = None
+        self.buffer_level_diff = 0.0
+        self.buffer_slope = 0.0
+        # (time, level) of the last level measured before the current time
+        self.previous_buffer_sample = None
+        self.buffer_time = None
+
+        self.stall_count = 0
+        self.stall_duration = 0.0
+        self.stall_started_at = None
+
+        self.played_qi = None
+        self.switch_count = 0
+
+    def add_throughput(self, time, throughput):
+        self.throughput_window.add(time, throughput)
+        self.throughput_ewma.add(time, throughput)
+
+    def add_buffer_level(self, time, level):
+        if self.buffer_level is not None:
+            self.buffer_level_diff = level - self.buffer_level
+            # the slope spans two different times, a level measured twice at the same time is replaced
+            if time != self.buffer_time:
+                self.previous_buffer_sample = (self.buffer_time, self.buffer_level)
+            if self.previous_buffer_sample is not None:
+                previous_time, previous_level = self.previous_buffer_sample
+                self.buffer_slope = (level - previous_level) / (time - previous_time)
+
+        self.buffer_level = level
+        self.buffer_time = time
+
+    def add_stall_start(self, time):
+        self.stall_count += 1
+        self.stall_started_at = time
+
+    def add_stall_end(self, time):
+        self.stall_duration += time - self.stall_started_at
+        self.stall_started_at = None
+
+    def add_played_qi(self, qi):
+        if self.played_qi is not None and qi != self.played_qi:
+            self.switch_count += 1
+        self.played_qi = qi
+
+    def get_throughput(self):
+        """
+        The last throughput (bps) measured, None before the first one.
+        """
+        return self.throughput_ewma.get_last()
+
+    def get_throughput_ewma(self):
+        return self.throughput_ewma.get_estimate()
+
+    def get_throughput_mean(self):
+        return self.throughput_window.get_mean()
+
+    def get_throughput_harmonic_mean(self):
+        return self.throughput_window.get_harmonic_mean()
+
+    def get_buffer_level(self):
+        """
+        Seconds of video to play at the last measurement, None before it.
+        """
+        return self.buffer_level
+
+    def get_buffer_level_diff(self):
+        return self.buffer_level_diff
+
+    def get_buffer_slope(self):
+        return self.buffer_slope
+
+    def is_stalled(self):
+        return self.stall_started_at is not None
+
+    def get_stall_count(self):
+        return self.stall_count
+
+    def get_stall_duration(self, time=None):
+        """
+        Total stall time (s), the current stall until time included.
+        """
+        if self.stall_started_at is not None and time is not None:
+            return self.stall_duration + time - self.stall_started_at
+        return self.stall_duration
+
+    def get_played_qi(self):
+        return self.played_qi
+
+    def get_switch_count(self):
+        return self.switch_count
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Growable table of samples (float by default) backed by a NumPy array.
+
+Rows are appended in amortized O(1) (the array doubles when it is full) and
+the filled rows are read as a read-only view, without copies.
+"""
+
+import numpy as np
+
+
+class SampleArray:
+
+    def __init__(self, columns, capacity=1024, dtype=np.float64):
+        self.__data = np.zeros((capacity, columns), dtype=dtype)
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def __getitem__(self, index):
+        # the filled rows only, as the view
+        return self.__data[:self.__size][index]
+
+    def __setitem__(self, index, value):
+        self.__data[:self.__size][index] = value
+
+    def append(self, *values):
+        if self.__size == len(self.__data):
+            data = np.zeros((2 * len(self.__data), self.__data.shape[1]), dtype=self.__data.dtype)
+            data[:self.__size] = self.__data
+            self.__data = data
+
+        self.__data[self.__size] = values
+        self.__size += 1
+
+    def view(self):
+        """
+        Read-only view of the filled rows. A view taken before a growth of
+        the array keeps pointing to the old (still valid) rows.
+        """
+        view = self.__data[:self.__size]
+        view.flags.writeable = False
+        return view
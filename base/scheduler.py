@@ -4,22 +4,107 @@
 
 @description: PyDash Project
 
-The Scheduler is a Singleton class implementation
+The Scheduler is a Singleton class implementation, a session with its own
+event queue creates one with Scheduler.create(timer) (see SessionContext)
+
+Events added without a delay are kept in a FIFO deque, while the events
+scheduled to a future timestamp are kept in a heap. Both queues are merged
+by (timestamp, insertion order), so events due at the same time are always
+dispatched in the order they were added. A cancelled event is only marked
+and is discarded when it reaches the head of its queue.
 """
 
+import heapq
+import itertools
+from collections import deque
+
 from base.singleton import Singleton
+from base.timer import Timer
 
 
 class Scheduler(metaclass=Singleton):
 
-    def __init__(self):
-        self.events = []
+    def __init__(self, timer=None):
+        # untimed events, (timestamp, sequence, event) in FIFO order
+        self.events = deque()
+        # timed events heap, (timestamp, sequence, event)
+        self.timed_events = []
+        self.sequence = itertools.count()
+        # number of events not yet dispatched nor cancelled
+        self.pending = 0
+        self.timer = timer or Timer.get_instance()
+
+    def add_event(self, event, delay=None):
+        """
+        Adds an event to be dispatched as soon as possible or, if delay (s)
+        is given, when the clock reaches the current time plus delay.
+        The event itself is returned to be used as a cancellation handle.
+        """
+        now = self.timer.perf_counter()
+        event.set_pending(True)
+        self.pending += 1
+
+        if delay is None:
+            self.events.append((now, next(self.sequence), event))
+        else:
+            heapq.heappush(self.timed_events, (now + max(delay, 0), next(self.sequence), event))
 
-    def add_event(self, event):
-        self.events.append(event)
+        return event
+
+    def cancel_event(self, event):
+        """
+        Cancels a pending event. Returns False if the event was already
+        dispatched or cancelled.
+        """
+        if not event.is_pending():
+            return False
+
+        event.set_pending(False)
+        self.pending -= 1
+        return True
 
     def get_event(self):
-        return self.events.pop(0)
+        self.__discard_cancelled()
+
+        if self.pending == 0:
+            raise IndexError('get_event() from an empty scheduler')
+
+        if self.events and (not self.timed_events or self.events[0][:2] <= self.timed_events[0][:2]):
+            _, _, event = self.events.popleft()
+        else:
+            timestamp, _, event = heapq.heappop(self.timed_events)
+
+            # the event is in the future, waiting for it (or moving the virtual clock)
+            waiting_time = timestamp - self.timer.perf_counter()
+            if waiting_time > 0:
+                self.timer.sleep(waiting_time)
+
+        event.set_pending(False)
+        self.pending -= 1
+        return event
+
+    def get_next_event_time(self):
+        """
+        Returns the timestamp of the next event to be dispatched or None
+        if the scheduler is empty.
+        """
+        self.__discard_cancelled()
+
+        if self.events:
+            return self.events[0][0]
+        if self.timed_events:
+            return self.timed_events[0][0]
+        return None
 
     def is_empty(self):
-        return bool(self.events == [])
+        return bool(self.pending == 0)
+
+    def __len__(self):
+        return self.pending
+
+    def __discard_cancelled(self):
+        while self.events and not self.events[0][2].is_pending():
+            self.events.popleft()
+
+        while self.timed_events and not self.timed_events[0][2].is_pending():
+            heapq.heappop(self.timed_events)
@@ -12,6 +12,8 @@ class SchedulerEvent:
         self.origin = src
         self.destination = dst
         self.msg = msg
+        # True while the event is waiting in the scheduler to be dispatched
+        self.pending = False
 
     def get_src(self):
         return self.origin
@@ -21,3 +23,9 @@ class SchedulerEvent:
 
     def get_msg(self):
         return self.msg
+
+    def set_pending(self, pending):
+        self.pending = pending
+
+    def is_pending(self):
+        return self.pending
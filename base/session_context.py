@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+The services of a session: configuration, timer, whiteboard and scheduler.
+
+Every module (Player, R2A and ConnectionHandler) takes them from the
+context it receives. The default context is made of the process-wide
+singletons, as before, so a single DashClient per process works unchanged.
+A context created from a configuration has its own instances, so several
+sessions can run one after another, or at the same time in threads, in a
+single process that has already imported numpy, skfuzzy, etc.:
+
+    for seed in range(10):
+        context = SessionContext.create(dict(parameters, traffic_shaping_seed=seed))
+        DashClient(context).run_application()
+"""
+
+from base.configuration_parser import ConfigurationParser
+from base.scheduler import Scheduler
+from base.timer import Timer
+from base.whiteboard import Whiteboard
+
+
+class SessionContext:
+
+    __default = None
+
+    def __init__(self, config_parser, timer, whiteboard, scheduler):
+        self.config_parser = config_parser
+        self.timer = timer
+        self.whiteboard = whiteboard
+        self.scheduler = scheduler
+
+    @staticmethod
+    def get_default():
+        """
+        The context of the process-wide singletons.
+        """
+        if SessionContext.__default is None:
+            SessionContext.__default = SessionContext(ConfigurationParser.get_instance(), Timer.get_instance(),
+                                                      Whiteboard.get_instance(), Scheduler())
+        return SessionContext.__default
+
+    @classmethod
+    def create(cls, parameters=None, file_name='dash_client.json'):
+        """
+        A new context of the configuration parameters (a dict), read from
+        file_name if it is None.
+        """
+        config_parser = ConfigurationParser(parameters, file_name)
+        timer = Timer(config_parser)
+        return cls(config_parser, timer, Whiteboard(), Scheduler.create(timer))
+
+    def get_parameter(self, key):
+        return self.config_parser.get_parameter(key)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Session record and replay (session_record parameter and replay.py).
+
+A session log is a compact binary file:
+    header   - the magic PDSESSN1 and the sizes of the three parts (<8sIQQ)
+    metadata - the configuration and the MPD of the session as JSON
+    events   - every SchedulerEvent dispatched (EVENT_DTYPE records)
+    samples  - the download samples of the ConnectionHandler, the time of
+               every chunk of a segment body and its size (SAMPLE_DTYPE)
+
+The samples are the network conditions observed in the session. get_trace()
+turns them into a bandwidth trace, so another R2A can be driven against the
+same conditions (see replay.py).
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from base.cache import write_file
+from base.message import MessageKind, SSMessage
+from base.sample_array import SampleArray
+from base.timer import Timer
+
+EVENT_DTYPE = np.dtype([('time', '<f8'), ('kind', 'u1'), ('src', 'i1'), ('dst', 'i1'), ('found', 'u1'),
+                        ('segment_id', '<i4'), ('quality_id', '<i4'), ('bit_length', '<i8')])
+
+SAMPLE_DTYPE = np.dtype([('time', '<f8'), ('bytes', '<u4')])
+
+
+class SessionRecorder:
+
+    def __init__(self, path, configuration, timer=None):
+        self.path = path
+        self.configuration = configuration
+        self.timer = timer or Timer.get_instance()
+        self.events = SampleArray(len(EVENT_DTYPE.names))
+        self.mpd = None
+
+    def record(self, event):
+        msg = event.get_msg()
+        if msg.get_kind() == MessageKind.XML_RESPONSE:
+            self.mpd = msg.get_payload()
+
+        if isinstance(msg, SSMessage):
+            found, segment_id, quality_id = msg.found(), msg.get_segment_id(), msg.get_quality_id()
+        else:
+            found, segment_id, quality_id = True, -1, -1
+
+        self.events.append(self.timer.get_current_time(), msg.get_kind().value, event.get_src(), event.get_dst(),
+                           found, segment_id, quality_id, msg.get_bit_length())
+
+    def save(self, download_samples):
+        """
+        Writes the log with the download samples (n, 2) of the session.
+        """
+        events = np.empty(len(self.events), dtype=EVENT_DTYPE)
+        for column, name in enumerate(EVENT_DTYPE.names):
+            events[name] = self.events.view()[:, column]
+
+        samples = np.empty(len(download_samples), dtype=SAMPLE_DTYPE)
+        samples['time'] = download_samples[:, 0]
+        samples['bytes'] = download_samples[:, 1]
+
+        SessionLog(self.configuration, self.mpd, events, samples).save(self.path)
+
+
+class SessionLog:
+
+    magic = b'PDSESSN1'
+    header = struct.Struct('<8sIQQ')
+
+    def __init__(self, configuration, mpd, events, samples):
+        self.configuration = configuration
+        self.mpd = mpd
+        self.events = events
+        self.samples = samples
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            magic, metadata_size, events_count, samples_count = cls.header.unpack(f.read(cls.header.size))
+            if magic != cls.magic:
+                raise ValueError(f'{path} is not a session log')
+
+            metadata = json.loads(f.read(metadata_size).decode())
+            events = np.frombuffer(f.read(events_count * EVENT_DTYPE.itemsize), dtype=EVENT_DTYPE)
+            samples = np.frombuffer(f.read(samples_count * SAMPLE_DTYPE.itemsize), dtype=SAMPLE_DTYPE)
+
+        return cls(metadata['configuration'], metadata['mpd'], events, samples)
+
+    def save(self, path):
+        metadata = json.dumps({'configuration': self.configuration, 'mpd': self.mpd}).encode()
+
+        # written aside and renamed, concurrent sessions never read a partial log
+        with write_file(path) as f:
+            f.write(self.header.pack(self.magic, len(metadata), len(self.events), len(self.samples)))
+            f.write(metadata)
+            f.write(np.ascontiguousarray(self.events, dtype=EVENT_DTYPE).tobytes())
+            f.write(np.ascontiguousarray(self.samples, dtype=SAMPLE_DTYPE).tobytes())
+
+    def get_segments(self):
+        """
+        Segment responses delivered to the Player (module 0), in order.
+        """
+        events = self.events
+        return events[(events['kind'] == MessageKind.SEGMENT_RESPONSE.value) & (events['dst'] == 0)]
+
+    def get_summary(self):
+        segments = self.get_segments()
+        segments = segments[segments['found'] == 1]
+        quality_ids = segments['quality_id'].astype(np.float64)
+
+        return {
+            'r2a_algorithm': self.configuration.get('r2a_algorithm'),
+            'segments': len(segments),
+            'average_quality_id': float(quality_ids.mean()) if len(quality_ids) else 0.0,
+            'switches': int(np.count_nonzero(np.diff(quality_ids))),
+            'downloaded_bits': int(segments['bit_length'].sum()),
+            'duration': float(self.events['time'][-1]) if len(self.events) else 0.0,
+        }
+
+    def get_trace(self, step=0.1):
+        """
+        Bandwidth (bps) every step seconds observed in the session. Each
+        chunk of a body was received at 8 * bytes / (time since the previous
+        sample), and the bandwidth is held while nothing is downloaded.
+        """
+        times, sizes = self.samples['time'], self.samples['bytes']
+        if not np.any(sizes):
+            raise ValueError('The session log has no download samples')
+
+        # chunks received at the same time are merged into the next one that took some time
+        edges, bits = [0.0], [0.0]
+        previous_time, pending, rate = 0.0, 0.0, None
+        for time, size in zip(times.tolist(), sizes.tolist()):
+            if size == 0:
+                # a new request, the time since the last chunk is an idle gap
+                if rate is not None and time > previous_time:
+                    edges.append(time)
+                    bits.append(bits[-1] + rate * (time - previous_time))
+                previous_time = time
+                continue
+
+            pending += 8 * size
+            if time > previous_time:
+                rate = pending / (time - previous_time)
+                if len(edges) == 1 and previous_time > 0:
+                    # before the first download, the first bandwidth observed
+                    edges.append(previous_time)
+                    bits.append(rate * previous_time)
+                edges.append(time)
+                bits.append(bits[-1] + pending)
+                previous_time, pending = time, 0.0
+
+        edges, bits = np.asarray(edges), np.asarray(bits)
+        grid = np.arange(max(int(edges[-1] // step), 1) + 1) * step
+        # the cumulative bits are linear inside each interval
+        cumulative = np.interp(grid, edges, bits)
+        return np.maximum(np.diff(cumulative) / step, 1.0)
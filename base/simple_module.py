@@ -10,15 +10,17 @@ Class implements basic functionality to be called by the main program.
 """
 
 from abc import ABCMeta, abstractmethod
-from base.scheduler import Scheduler
+from base.session_context import SessionContext
 from base.scheduler_event import SchedulerEvent
 from base.message import Message, MessageKind
 
 
 class SimpleModule(metaclass=ABCMeta):
 
-    def __init__(self, id):
-        self.scheduler = Scheduler()
+    def __init__(self, id, context=None):
+        # services of the session, the process-wide singletons by default
+        self.context = context or SessionContext.get_default()
+        self.scheduler = self.context.scheduler
         self.id = id
 
     def send_up(self, msg):
@@ -31,6 +33,14 @@ class SimpleModule(metaclass=ABCMeta):
     def send_down(self, msg):
         self.scheduler.add_event(SchedulerEvent(msg, self.id, self.id + 1))
 
+    def send_self(self, msg, delay=None):
+        """
+        Sends a message to the module itself, after delay seconds if given.
+        It returns the scheduler event that can be used to cancel the delivery
+        with self.scheduler.cancel_event().
+        """
+        return self.scheduler.add_event(SchedulerEvent(msg, self.id, self.id), delay)
+
     @abstractmethod
     def initialize(self):
         print(f'> Initializing module {self.__class__.__name__}')
@@ -57,8 +67,14 @@ class SimpleModule(metaclass=ABCMeta):
     def handle_segment_size_response(self, msg):
         pass
 
+    def handle_self_message(self, msg):
+        # modules that send messages to themselves (timers) should override this method
+        pass
+
     def handle_message(self, msg):
-        if msg.get_kind() == MessageKind.XML_REQUEST:
+        if msg.get_kind() == MessageKind.SELF:
+            self.handle_self_message(msg)
+        elif msg.get_kind() == MessageKind.XML_REQUEST:
             self.handle_xml_request(msg)
         elif msg.get_kind() == MessageKind.XML_RESPONSE:
             self.handle_xml_response(msg)
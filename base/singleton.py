@@ -13,3 +13,9 @@ class Singleton(type):
         if cls not in cls._instances:
             cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
+
+    def create(cls, *args, **kwargs):
+        """
+        Creates an instance apart from the singleton one (see SessionContext).
+        """
+        return super(Singleton, cls).__call__(*args, **kwargs)
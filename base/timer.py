@@ -5,9 +5,22 @@
 @description: PyDash Project
 
 A Global timer reference used by all classes.
+
+The timer works in two modes. In the real time mode (default) the clock
+follows time.perf_counter() and sleep() blocks the caller. In the virtual
+time mode (virtual_time parameter in dash_client.json) the clock is
+simulated: sleep() only advances the clock and runs, in time order, every
+callback registered with call_later() that is due in the meantime.
+
+get_instance() returns the timer shared by the process, a session with its
+own clock creates a Timer of its configuration (see SessionContext).
 """
+import heapq
+import itertools
 import time
 
+from base.configuration_parser import ConfigurationParser
+
 
 class Timer():
     __instance = None
@@ -15,19 +28,80 @@ class Timer():
     @staticmethod
     def get_instance():
         if Timer.__instance is None:
-            Timer()
+            Timer.__instance = Timer()
         return Timer.__instance
 
-    def __init__(self):
-        if Timer.__instance is not None:
-            raise Exception('This class is a singleton!')
-        else:
-            # for the statistics purpose
-            self.started_time = time.perf_counter()
-            Timer.__instance = self
+    def __init__(self, config_parser=None):
+        config_parser = config_parser or ConfigurationParser.get_instance()
+        self.virtual = bool(config_parser.get_parameter('virtual_time'))
+
+        # simulated clock and pending callbacks (virtual time mode only)
+        self.virtual_clock = 0.0
+        self.callbacks = []
+        self.callbacks_counter = itertools.count()
+
+        # for the statistics purpose
+        self.started_time = 0.0 if self.virtual else time.perf_counter()
+
+    def is_virtual(self):
+        return self.virtual
+
+    def perf_counter(self):
+        """
+        Drop-in replacement for time.perf_counter() that follows the
+        simulated clock when the virtual time mode is enabled.
+        """
+        if self.virtual:
+            return self.virtual_clock
+        return time.perf_counter()
 
     def get_current_time(self):
-        return round(time.perf_counter() - self.started_time, 6)
+        return round(self.perf_counter() - self.started_time, 6)
 
     def get_started_time(self):
         return self.started_time
+
+    def sleep(self, seconds):
+        if not self.virtual:
+            time.sleep(seconds)
+            return
+
+        self.advance_to(self.virtual_clock + max(seconds, 0))
+
+    def call_later(self, delay, callback):
+        """
+        Registers a callback to be executed when the simulated clock reaches
+        the current time plus delay. Callbacks with the same deadline run in
+        the registration order.
+        """
+        if not self.virtual:
+            raise ValueError('call_later() is only available in the virtual time mode')
+
+        deadline = self.virtual_clock + max(delay, 0)
+        heapq.heappush(self.callbacks, (deadline, next(self.callbacks_counter), callback))
+
+    def has_pending_callbacks(self):
+        return bool(self.callbacks)
+
+    def advance_to(self, deadline):
+        """
+        Moves the simulated clock up to deadline running all the callbacks
+        that are due until there.
+        """
+        while self.callbacks and self.callbacks[0][0] <= deadline:
+            callback_time, _, callback = heapq.heappop(self.callbacks)
+            self.virtual_clock = max(self.virtual_clock, callback_time)
+            callback()
+
+        self.virtual_clock = max(self.virtual_clock, deadline)
+
+    def run_next_callback(self):
+        """
+        Moves the simulated clock to the next pending callback and executes it.
+        Returns False when there is no callback to run.
+        """
+        if not self.callbacks:
+            return False
+
+        self.advance_to(self.callbacks[0][0])
+        return True
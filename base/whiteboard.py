@@ -6,8 +6,34 @@
 
 Whiteboard structure to deliver statistical information
 from the Player to the R2A algorithms.
+
+get_instance() returns the whiteboard shared by the process, each session
+of a SessionContext has its own Whiteboard.
+
+The histories are the growable arrays of the Player (SampleArray), so the
+getters return read-only views of the rows stored so far, without copies,
+in O(1) whatever the length of the session. A WhiteboardCursor
+(get_cursor()) returns only the rows appended since its previous read.
 """
 
+import numpy as np
+
+
+class WhiteboardCursor:
+
+    def __init__(self, get_history):
+        self.get_history = get_history
+        # rows already read
+        self.position = 0
+
+    def read(self):
+        """
+        Read-only view of the rows appended since the previous read.
+        """
+        rows = self.get_history()[self.position:]
+        self.position += len(rows)
+        return rows
+
 
 class Whiteboard:
     __instance = None
@@ -15,24 +41,21 @@ class Whiteboard:
     @staticmethod
     def get_instance():
         if Whiteboard.__instance is None:
-            Whiteboard()
+            Whiteboard.__instance = Whiteboard()
         return Whiteboard.__instance
 
     def __init__(self):
-        if Whiteboard.__instance is not None:
-            raise Exception('This class is a singleton!')
-        else:
-            Whiteboard.__instance = self
-            self.__buffer = []
-            self.__playback = []
-            self.__playback_qi = []
-            self.__playback_pauses = []
-            self.__playback_buffer_size = []
-            self.__playback_segment_size_time_at_buffer = []
-            # partial segment size time at buffer list
-            self.__partial_sstb = []
-            self.__max_buffer_size = 0
-            self.__amount_video_to_play = 0
+        # SampleArray histories, until the Player adds them
+        self.__buffer = None
+        self.__playback = None
+        self.__playback_qi = None
+        self.__playback_pauses = None
+        self.__playback_buffer_size = None
+        self.__playback_segment_size_time_at_buffer = None
+        self.__max_buffer_size = 0
+        self.__amount_video_to_play = 0
+        self.__download_samples = None
+        self.__features = None
 
     def add_buffer(self, buffer):
         self.__buffer = buffer
@@ -55,31 +78,60 @@ class Whiteboard:
     def add_playback_history(self, playback):
         self.__playback = playback
 
+    def add_download_samples(self, download_samples):
+        self.__download_samples = download_samples
+
+    def add_features(self, features):
+        self.__features = features
+
     def add_playback_segment_size_time_at_buffer(self, segment_size_time_at_buffer):
         self.__playback_segment_size_time_at_buffer = segment_size_time_at_buffer
 
     def get_playback_segment_size_time_at_buffer(self):
         """
-        It returns a list of the time each segment size spends
-        in the buffer before was played by the player. The list
+        It returns a read-only NumPy array of the time each segment size spends
+        in the buffer before was played by the player. The array
         will increase over time. It is ordered from the oldest
         segment until de newest one (from the begging until the
         end of the reproduced video).
         """
-        pos = 0
-
-        try:
-            pos = [x[1] for x in self.__playback_segment_size_time_at_buffer].index(-1, max(len(self.__partial_sstb) - 1, 0))
-        except:
-            pos = len(self.__playback_segment_size_time_at_buffer)
+        # the Player appends the time of each segment size when it is played,
+        # so the list is a view of the times already computed
+        if self.__playback_segment_size_time_at_buffer is None:
+            return np.zeros(0)
+        return self.__playback_segment_size_time_at_buffer.view()[:, 0]
 
-        plist = [round(x[1] - x[0], 6) for x in self.__playback_segment_size_time_at_buffer[len(self.__partial_sstb):pos]]
-        self.__partial_sstb = self.__partial_sstb + plist
+    def get_buffer(self):
+        """
+        It returns a read-only NumPy array of the QI of every second of video
+        stored in the __buffer, the played ones included. The __buffer keeps
+        one entry per segment, so the array is built on each call, in O(n).
+        """
+        if self.__buffer is None:
+            return np.zeros(0, dtype=np.int32)
+        return self.__buffer.get_qi_per_second()
 
-        return tuple(self.__partial_sstb)
+    def get_buffer_segments(self):
+        """
+        It returns a read-only NumPy array (n, 3) of the segments stored in
+        the __buffer, the played ones included: QI, position (s) of the end
+        of the segment in the video and time it was written in the __buffer.
+        It is built on each call, in O(n).
+        """
+        if self.__buffer is None:
+            return np.zeros((0, 3))
+        return self.__buffer.get_segments()
 
-    def get_buffer(self):
-        return tuple(self.__buffer)
+    def get_buffer_runs(self):
+        """
+        It returns a read-only NumPy array (n, 2) of the runs of consecutive
+        segments of the same duration stored in the __buffer: segment
+        duration (s) and number of segments. The last run grows while the
+        duration does not change.
+        """
+        if self.__buffer is None:
+            return np.zeros((0, 2))
+        return self.__buffer.get_runs()
 
     def get_amount_video_to_play(self):
         """
@@ -95,33 +147,79 @@ class Whiteboard:
 
     def get_playback_qi(self):
         """
-        It returns a tuples list of time and QI's segments already played by the Player.
+        It returns a read-only NumPy array (n, 2) of time and QI's segments already played by the Player.
         The time represents the moment when a QI segment was consumed (played) by the Player.
         """
-        return tuple(self.__playback_qi)
+        return self.__history(self.__playback_qi)
 
     def get_playback_pauses(self):
         """
-        It returns a tuples list of time and pauses happened during the playing of
+        It returns a read-only NumPy array (n, 2) of time and pauses happened during the playing of
         the video. The time (s) represents the moment when a video pause occurred and
         the pauses represents the lenght of this pauses.
         """
 
-        return tuple(self.__playback_pauses)
+        return self.__history(self.__playback_pauses)
 
     def get_playback_buffer_size(self):
         """
-        It returns a tuples list of time and __buffer size during the playing video.
+        It returns a read-only NumPy array (n, 2) of time and __buffer size during the playing video.
         The time represents the moment when the __buffer size was measured.
         """
 
-        return tuple(self.__playback_buffer_size)
+        return self.__history(self.__playback_buffer_size)
 
     def get_playback_history(self):
         """
-        It returns a tuples list of time and __playback history happened during
+        It returns a read-only NumPy array (n, 2) of time and __playback history happened during
         the playing video. The time represents the moment when was measured the possible
         to play or not the video. For __playback, the number one means it was possible to
         play and zero is otherwise.
         """
-        return tuple(self.__playback)
+        return self.__history(self.__playback)
+
+    def get_download_samples(self):
+        """
+        It returns a read-only NumPy array (n, 2) of the samples taken while
+        the segments were downloaded. Each row is the time (s) a chunk of a
+        segment body was received and its size in bytes. Every segment
+        request starts with a row of zero bytes at the request time, so the
+        throughput since the request is sum(bytes) / (time[-1] - time[start]).
+        """
+        if self.__download_samples is None:
+            return np.zeros((0, 2))
+        return self.__download_samples.view()
+
+    def get_features(self):
+        """
+        It returns the FeatureStore of the Player: throughput EWMA and sliding
+        window means, buffer level slope, stalls and switches, all of them
+        kept up to date by the Player and read in O(1). None before the
+        Player is created.
+        """
+        return self.__features
+
+    def get_cursor(self, history):
+        """
+        It returns a WhiteboardCursor of a history: playback_history,
+        playback_qi, playback_pauses, playback_buffer_size or download_samples.
+        Each read() returns the rows appended since the previous one, so an
+        R2A consumes a history in constant time per decision.
+        """
+        histories = {
+            'playback_history': self.get_playback_history,
+            'playback_qi': self.get_playback_qi,
+            'playback_pauses': self.get_playback_pauses,
+            'playback_buffer_size': self.get_playback_buffer_size,
+            'download_samples': self.get_download_samples,
+        }
+        if history not in histories:
+            raise ValueError(f'Invalid whiteboard history - {history}')
+
+        return WhiteboardCursor(histories[history])
+
+    @staticmethod
+    def __history(samples):
+        if samples is None:
+            return np.zeros((0, 2))
+        return samples.view()
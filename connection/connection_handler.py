@@ -12,39 +12,29 @@ Also it implements a traffic shaping approach.
 
 from base.simple_module import SimpleModule
 from base.message import Message, MessageKind, SSMessage
-from base.configuration_parser import ConfigurationParser
 from player.parser import *
+from connection.connection_pool import ConnectionPool
+from connection.traffic_shaper import SequenceProfile, TrafficShaper
+from connection.trace_profile import TraceProfile
+from connection.profile_generator import MarkovProfileGenerator
+from base.sample_array import SampleArray
 import http.client
-import time
-from scipy.stats import expon
-from base.timer import Timer
-import math
-import seaborn as sns
-import matplotlib.pyplot as plt
+import numpy as np
 
 
 class ConnectionHandler(SimpleModule):
 
-    def __init__(self, id):
-        SimpleModule.__init__(self, id)
-        self.initial_time = 0
+    def __init__(self, id, context=None):
+        SimpleModule.__init__(self, id, context)
         self.qi = []
 
         # for traffic shaping
-        config_parser = ConfigurationParser.get_instance()
+        config_parser = self.context.config_parser
         self.traffic_shaping_interval = int(config_parser.get_parameter('traffic_shaping_profile_interval'))
         self.traffic_shaping_seed = int(config_parser.get_parameter('traffic_shaping_seed'))
         self.traffic_shaping_values = []
 
-        # mark the current traffic shapping interval
-        self.current_traffic_shaping_interval = 0
-
         self.traffic_shaping_sequence = []
-        # traffic shaping sequence position
-        self.tss_position = 0
-        # traffic shaping values position
-        self.tsv_position = 0
-
         token = config_parser.get_parameter('traffic_shaping_profile_sequence')
         for i in range(len(token)):
             if token[i] == 'L':
@@ -54,92 +44,147 @@ class ConnectionHandler(SimpleModule):
             elif token[i] == 'H':
                 self.traffic_shaping_sequence.append(2)
 
-        self.timer = Timer.get_instance()
-
-    def get_traffic_shaping_positions(self):
-        current_tsi = self.timer.get_current_time() // self.traffic_shaping_interval
-
-        if current_tsi > self.current_traffic_shaping_interval:
-            self.current_traffic_shaping_interval = current_tsi
-            self.tss_position = (self.tss_position + 1) % len(self.traffic_shaping_sequence)
-
-        self.tsv_position = (self.tsv_position + 1) % len(self.traffic_shaping_values[0])
-
-        return self.tss_position, self.tsv_position
-
-    def __get_next_traffic_shaping_positions(self):
-        self.tss_position = (self.tss_position + 1) % len(self.traffic_shaping_sequence)
-        self.tsv_position = (self.tsv_position + 1) % len(self.traffic_shaping_values[0])
-        return self.tss_position, self.tsv_position
+        self.timer = self.context.timer
+
+        # the segment bodies are only counted, they are read over and over into the same buffer,
+        # allocated by the first body
+        self.receive_buffer_size = int(config_parser.get_parameter('receive_buffer_size'))
+        self.receive_buffer = None
+
+        # the bodies are shaped while they are read, chunk by chunk, with bursts of at most one chunk,
+        # so even the smallest segments are received at the target throughput. In the virtual time
+        # mode the shaper is what moves the clock during a transfer, so no burst is allowed
+        bucket_size = 0
+        if not self.timer.is_virtual():
+            bucket_size = min(float(config_parser.get_parameter('traffic_shaping_bucket_size')),
+                              8 * self.receive_buffer_size)
+        self.traffic_shaper = TrafficShaper(bucket_size, self.timer)
+
+        # sequence: L, M and H levels derived from the mpd, trace: bandwidth trace file,
+        # markov: Markov chain among the L, M and H levels derived from the mpd
+        self.traffic_shaping_profile = config_parser.get_parameter('traffic_shaping_profile')
+        self.profile_generator = None
+        if self.traffic_shaping_profile == 'trace':
+            self.traffic_shaper.set_profile(TraceProfile.open(config_parser.get_parameter('traffic_shaping_trace'),
+                                                              float(config_parser.get_parameter('traffic_shaping_trace_step')),
+                                                              float(config_parser.get_parameter('traffic_shaping_trace_scale')),
+                                                              config_parser))
+        elif self.traffic_shaping_profile == 'markov':
+            self.profile_generator = MarkovProfileGenerator(config_parser.get_parameter('traffic_shaping_markov_transitions'),
+                                                            config_parser.get_parameter('traffic_shaping_markov_distributions'),
+                                                            float(config_parser.get_parameter('traffic_shaping_markov_step')),
+                                                            float(config_parser.get_parameter('traffic_shaping_markov_duration')),
+                                                            self.traffic_shaping_seed, config_parser)
+        elif self.traffic_shaping_profile != 'sequence':
+            raise ValueError(f'Invalid traffic_shaping_profile parameter - {self.traffic_shaping_profile}')
+
+        # persistent connections to the HTTP servers
+        self.connection_pool = ConnectionPool(bool(config_parser.get_parameter('connection_keep_alive')),
+                                              float(config_parser.get_parameter('connection_idle_timeout')),
+                                              int(config_parser.get_parameter('connection_pool_size')))
+
+        # (time, bytes) of every chunk of the segment bodies, shared with the R2A through the whiteboard
+        self.download_samples = SampleArray(2)
+        self.context.whiteboard.add_download_samples(self.download_samples)
+
+        # segment download abandonment, the R2A is consulted every segment_abandonment_interval seconds
+        self.segment_abandonment = bool(config_parser.get_parameter('segment_abandonment'))
+        self.segment_abandonment_interval = float(config_parser.get_parameter('segment_abandonment_interval'))
+        self.download_progress_callback = None
+        self.abandoned_segments = 0
+        self.wasted_bytes = 0
+
+    def set_download_progress_callback(self, callback):
+        """
+        callback(msg, received, total, elapsed) is consulted while a segment
+        body is downloaded, it returns a new quality_id to abandon the
+        download or None (see IR2A.handle_segment_download_progress()).
+        """
+        self.download_progress_callback = callback
+
+    @staticmethod
+    def split_host(host_name):
+        # host[:port] of the url, port 80 by default
+        host, _, port = host_name.partition(':')
+        return host, port or '80'
+
+    def request(self, host_name, port, path_name):
+        """
+        Sends a GET request to the server, returning (connection, response).
+        """
+        return self.connection_pool.request(host_name, port, path_name)
+
+    def release(self, connection, response):
+        self.connection_pool.release(connection, response)
 
     def initialize(self):
         # self.send_down(Message(MessageKind.SEGMENT_REQUEST, 'Olá Mundo'))
         pass
 
-    def bandwidth_limitation(self, package_size=0):
-        if package_size == 0:
-            return
-
-        tsp = self.get_traffic_shaping_positions()
-        target_throughput = self.traffic_shaping_values[self.traffic_shaping_sequence[tsp[0]]][tsp[1]]
-
-        rtt = time.perf_counter() - self.initial_time
-        throughput = package_size / rtt
-
-        # we didn't pass our throughput go
-        if target_throughput >= throughput:
-            return
-
-        waiting_time = (package_size - (target_throughput * rtt)) / target_throughput
-
-        st_data = []
-        if waiting_time > self.traffic_shaping_interval:
-
-            waiting_time = self.traffic_shaping_interval
-            length = package_size - (waiting_time * target_throughput)
-            st_data.append((target_throughput, self.traffic_shaping_interval))
-
-            while length > 0:
-                tsp = self.__get_next_traffic_shaping_positions()
-                target_throughput = self.traffic_shaping_values[self.traffic_shaping_sequence[tsp[0]]][tsp[1]]
+    def receive_body(self, response, msg=None):
+        """
+        Reads the whole body of response into the receive buffer, chunk by
+        chunk, and returns (size in bytes, None). Every chunk goes through
+        the traffic shaper and is recorded in the download samples.
+
+        When msg (the segment request) is given and the abandonment is
+        enabled, the download progress callback is consulted periodically.
+        If it returns a new quality_id, the reading stops and (received
+        bytes, quality_id) is returned.
+        """
+        if self.receive_buffer is None:
+            self.receive_buffer = memoryview(bytearray(self.receive_buffer_size))
+
+        consult = msg is not None and self.segment_abandonment and self.download_progress_callback is not None
+        total = response.length
+        start = self.timer.perf_counter()
+        next_check = start + self.segment_abandonment_interval
+
+        size = 0
+        while True:
+            length = response.readinto(self.receive_buffer)
+            if length == 0:
+                return size, None
+            size += length
+            self.traffic_shaper.consume(8 * length)
+            self.download_samples.append(self.timer.get_current_time(), length)
+
+            if consult and self.timer.perf_counter() >= next_check:
+                now = self.timer.perf_counter()
+                next_check = now + self.segment_abandonment_interval
+                quality_id = self.download_progress_callback(msg, size, total, now - start)
+                if quality_id is not None:
+                    return size, quality_id
 
-                t = length / target_throughput
-
-                if t > self.traffic_shaping_interval:
-                    waiting_time += self.traffic_shaping_interval
-                    length = length - (self.traffic_shaping_interval * target_throughput)
-                    st_data.append((target_throughput, self.traffic_shaping_interval))
-                else:
-                    waiting_time += t
-                    length = length - (t * target_throughput)
-                    st_data.append((target_throughput, t))
-
-        time.sleep(waiting_time)
-
-        if len(st_data) > 0:
-            target_throughput = package_size / (time.perf_counter() - self.initial_time)
-
-        #print(f'Execution Time {self.timer.get_current_time()} > target throughput: {target_throughput} - {st_data}')
+    def finalization(self):
+        statistics = self.connection_pool.get_statistics()
+        if statistics['requests'] > 0:
+            print(f'> Connection pool: {statistics["requests"]} requests, {statistics["connections"]} connections, '
+                  f'{statistics["reconnections"]} reconnections')
+            print(f'  >> Reuse ratio: {round(statistics["reuse_ratio"], 2)}')
+            print(f'  >> Mean connect time: {round(statistics["mean_connect_time"] * 1000, 3)} ms')
+        self.connection_pool.close()
 
+        print(f'> Traffic shaper: {int(self.traffic_shaper.shaped_bits)} bits shaped')
+        print(f'  >> Waiting time: {round(self.traffic_shaper.waiting_time, 2)} s')
 
-    def finalization(self):
-        pass
+        if self.segment_abandonment:
+            print(f'> Abandoned segments: {self.abandoned_segments}')
+            print(f'  >> Wasted bytes: {self.wasted_bytes}')
 
     def handle_xml_request(self, msg):
         if not 'http://' in msg.get_payload():
             raise ValueError('url_mpd parameter should starts with http://')
 
         url_tokens = msg.get_payload().split('/')[2:]
-        port = '80'
-        host_name = url_tokens[0]
+        host_name, port = self.split_host(url_tokens[0])
         path_name = '/' + '/'.join(url_tokens[1:])
         mdp_file = ''
 
         try:
-            connection = http.client.HTTPConnection(host_name, port)
-            connection.request('GET', path_name)
-            mdp_file = connection.getresponse().read().decode()
-            connection.close()
+            connection, response = self.request(host_name, port, path_name)
+            mdp_file = response.read().decode()
+            self.release(connection, response)
         except Exception as err:
             print('> Houston, we have a problem!')
             print(f'> trying to connecto to: {msg.get_payload()}')
@@ -153,34 +198,59 @@ class ConnectionHandler(SimpleModule):
         parsed_mpd = parse_mpd(msg.get_payload())
         self.qi = parsed_mpd.get_qi()
 
+        if self.traffic_shaping_profile != 'trace':
+            self.traffic_shaper.set_profile(self.create_traffic_shaping_profile())
+
+        # the profile depends on the mpd, so it is only charged after the download in the virtual time mode
+        if self.timer.is_virtual():
+            self.traffic_shaper.consume(msg.get_bit_length())
+
+        self.send_up(msg)
+
+    def create_traffic_shaping_profile(self):
+        """
+        Profile of the sequence and markov modes, whose levels are derived
+        from the qi of the mpd.
+        """
         increase_factor = 1
         low = round(self.qi[len(self.qi) - 1] * increase_factor)
         medium = round(self.qi[(len(self.qi) // 2) - 1] * increase_factor)
         high = round(self.qi[0] * increase_factor)
 
-        self.traffic_shaping_values.append(
-            expon.rvs(scale=1, loc=low, size=1000, random_state=self.traffic_shaping_seed))
-        self.traffic_shaping_values.append(
-            expon.rvs(scale=1, loc=medium, size=1000, random_state=self.traffic_shaping_seed))
-        self.traffic_shaping_values.append(
-            expon.rvs(scale=1, loc=high, size=1000, random_state=self.traffic_shaping_seed))
+        if self.traffic_shaping_profile == 'markov':
+            return self.profile_generator.get_profile([low, medium, high])
 
-        self.send_up(msg)
+        # the same Exp(1) draws of every level, as expon.rvs(loc=level, size=1000, random_state=seed)
+        draws = np.random.RandomState(self.traffic_shaping_seed).standard_exponential(1000)
+        self.traffic_shaping_values = [level + draws for level in (low, medium, high)]
+        return SequenceProfile(self.traffic_shaping_sequence, self.traffic_shaping_interval, self.traffic_shaping_values)
 
     def handle_segment_size_request(self, msg):
-        port = '80'
-        host_name = msg.get_host_name()
+        host_name, port = self.split_host(msg.get_host_name())
         path_name = msg.get_url()
-        ss_file = ''
-        self.initial_time = time.perf_counter()
+        size = 0
+        status = http.client.OK
+        self.download_samples.append(self.timer.get_current_time(), 0)
 
         print(f'Execution Time {self.timer.get_current_time()} > selected QI: {self.qi.index(msg.get_quality_id())}')
 
         try:
-            connection = http.client.HTTPConnection(host_name, port)
-            connection.request('GET', path_name)
-            ss_file = connection.getresponse().read()
-            connection.close()
+            while True:
+                connection, response = self.request(host_name, port, path_name)
+                status = response.status
+                size, quality_id = self.receive_body(response, msg if status == http.client.OK else None)
+                # an abandoned response is not entirely read, so its connection is closed
+                self.release(connection, response)
+
+                if quality_id is None:
+                    break
+
+                print(f'Execution Time {self.timer.get_current_time()} > abandoned QI: {self.qi.index(msg.get_quality_id())} '
+                      f'after {size} bytes, selected QI: {self.qi.index(quality_id)}')
+                self.abandoned_segments += 1
+                self.wasted_bytes += size
+                msg.add_quality_id(quality_id)
+                path_name = msg.get_url()
         except Exception as err:
             print('> Houston, we have a problem!')
             print(f'> trying to connecto to: {msg.get_payload()}')
@@ -190,18 +260,11 @@ class ConnectionHandler(SimpleModule):
 
         msg.set_kind(MessageKind.SEGMENT_RESPONSE)
 
-        decoded = False
-
-        try:
-            ss_file = ss_file.decode()
-        except UnicodeDecodeError:
-            # if wasn't possible to decode() is a ss
-            msg.add_bit_length(8 * len(ss_file))
-            self.bandwidth_limitation(msg.get_bit_length())
-            decoded = True
-
-        if not decoded and '404 Not Found' in ss_file:
+        # any error status (404, 500, 503...) is a segment not found, its error page is not a throughput sample
+        if status != http.client.OK:
             msg.set_found(False)
+        else:
+            msg.add_bit_length(8 * size)
 
         self.send_up(msg)
 
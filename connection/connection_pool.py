@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Pool of persistent HTTP/1.1 connections used by the ConnectionHandler.
+
+Idle connections are kept per (host, port) and reused by the next request
+to the same server, saving a TCP handshake per segment. Connections idle
+for longer than idle_timeout seconds are closed instead of reused, as the
+servers usually drop them. When a reused connection turns out to be
+closed by the server the request is sent again over a new connection.
+
+The pool works with the real (wall clock) time even in the virtual time
+mode, as the idle timeouts belong to the sockets.
+"""
+
+import collections
+import http.client
+import time
+
+
+class ConnectionPool:
+
+    def __init__(self, keep_alive=True, idle_timeout=5.0, max_idle=4):
+        """
+        keep_alive:   False closes every connection after its request (one connection per request)
+        idle_timeout: seconds an idle connection may wait for its next request
+        max_idle:     idle connections kept per (host, port)
+        """
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+
+        # (host, port) -> deque of (connection, release time), the most recent on the right
+        self.idle = collections.defaultdict(collections.deque)
+
+        # statistics
+        self.requests = 0
+        self.reused = 0
+        self.connections = 0
+        self.reconnections = 0
+        self.connect_time = 0.0
+
+    def request(self, host, port, path, method='GET'):
+        """
+        Sends a request and returns (connection, response). The response
+        must be read before the connection is given back with release().
+        """
+        key = (host, str(port))
+        self.requests += 1
+
+        connection = self.__acquire(key)
+        if connection is not None:
+            try:
+                response = self.__send(connection, method, path)
+                self.reused += 1
+                return connection, response
+            except (ConnectionError, http.client.BadStatusLine):
+                # reset or closed by the server while idle
+                connection.close()
+                self.reconnections += 1
+
+        connection = self.__connect(key)
+        return connection, self.__send(connection, method, path)
+
+    def release(self, connection, response):
+        """
+        Gives a connection back to the pool, it is closed if keep alive is
+        disabled, if the server asked to close it or if the response was
+        not entirely read.
+        """
+        if not self.keep_alive or response.will_close or not response.isclosed():
+            connection.close()
+            return
+
+        idle = self.idle[(connection.host, str(connection.port))]
+        idle.append((connection, time.monotonic()))
+        while len(idle) > self.max_idle:
+            idle.popleft()[0].close()
+
+    def close(self):
+        for idle in self.idle.values():
+            while idle:
+                idle.popleft()[0].close()
+
+    def get_statistics(self):
+        return {
+            'requests': self.requests,
+            'connections': self.connections,
+            'reused': self.reused,
+            'reconnections': self.reconnections,
+            'reuse_ratio': self.reused / self.requests if self.requests > 0 else 0.0,
+            'mean_connect_time': self.connect_time / self.connections if self.connections > 0 else 0.0,
+        }
+
+    def __acquire(self, key):
+        idle = self.idle.get(key)
+        if not idle:
+            return None
+
+        # the oldest connections are on the left, the expired ones are closed
+        now = time.monotonic()
+        while idle and now - idle[0][1] > self.idle_timeout:
+            idle.popleft()[0].close()
+
+        return idle.pop()[0] if idle else None
+
+    def __connect(self, key):
+        host, port = key
+        connection = http.client.HTTPConnection(host, port)
+
+        start = time.perf_counter()
+        connection.connect()
+        self.connect_time += time.perf_counter() - start
+        self.connections += 1
+
+        return connection
+
+    @staticmethod
+    def __send(connection, method, path):
+        connection.request(method, path)
+        return connection.getresponse()
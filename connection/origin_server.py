@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Local DASH origin server, so the sessions and the load tests of the
+ConnectionHandler do not depend on the remote url_mpd host.
+
+    python -m connection.origin_server --port 8080
+
+and then, in dash_client.json,
+
+    "url_mpd": "http://127.0.0.1:8080/DASH/BigBuckBunny/1sec/BigBuckBunny_1s_simple_2014_05_09.mpd"
+
+Any path ending with .mpd returns the MPD of the presentation (equivalent to
+the BigBuckBunny 1s one) and the segments are looked up in its directory.
+There is no stored media: the segment sizes come from a SegmentSizeIndex
+(segment_index.py) and every body is a slice of a single payload file of
+the largest segment size, sent with sendfile() (or written from a
+memoryview of the same payload where sendfile is not available), so a
+response costs no copies in user space.
+
+The server is a single asyncio loop with persistent HTTP/1.1 connections.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import tempfile
+import time
+import urllib.parse
+
+from connection.segment_index import SegmentSizeIndex, template_pattern
+
+# size (bytes) of the initialization segments, they carry no media
+INITIALIZATION_SIZE = 862
+
+NOT_FOUND = b'<html><head><title>404 Not Found</title></head><body><h1>Not Found</h1></body></html>'
+
+
+class OriginServer:
+
+    reasons = {200: 'OK', 404: 'Not Found', 501: 'Not Implemented'}
+
+    def __init__(self, index, host='127.0.0.1', port=8080):
+        self.index = index
+        self.host = host
+        self.port = port
+
+        self.mpd = index.get_mpd().encode()
+        self.media_pattern = template_pattern(index.media)
+        self.initialization_pattern = template_pattern(index.initialization)
+
+        # every body is a prefix of this payload
+        payload_size = max(index.get_max_size(), INITIALIZATION_SIZE)
+        self.payload = memoryview(bytes(range(256)) * (payload_size // 256 + 1))[:payload_size]
+        self.payload_file = tempfile.TemporaryFile()
+        self.payload_file.write(self.payload)
+        self.payload_file.flush()
+        self.use_sendfile = hasattr(os, 'sendfile')
+
+        # for the statistics purpose
+        self.connections = 0
+        self.requests = 0
+        self.sent_bytes = 0
+        self.start_time = None
+
+    def route(self, path):
+        """
+        Returns (status, body): the MPD bytes or the size of a segment body.
+        """
+        if path.endswith('.mpd'):
+            return 200, self.mpd
+
+        match = self.media_pattern.search(path)
+        if match:
+            size = self.index.get_size(int(match['number']), int(match['bandwidth']))
+            if size is not None:
+                return 200, size
+
+        match = self.initialization_pattern.search(path)
+        if match and int(match['bandwidth']) in self.index.columns:
+            return 200, INITIALIZATION_SIZE
+
+        return 404, NOT_FOUND
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, version = lines[0].split(' ', 2)
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip().lower()
+
+                connection = headers.get('connection', '')
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                if method in ('GET', 'HEAD'):
+                    # the player requests the absolute url
+                    status, body = self.route(urllib.parse.urlsplit(target).path)
+                else:
+                    status, body = 501, b''
+
+                size = body if isinstance(body, int) else len(body)
+                content_type = 'application/dash+xml' if body is self.mpd else 'video/mp4' if status == 200 else 'text/html'
+                writer.write((f'HTTP/1.1 {status} {self.reasons[status]}\r\n'
+                              f'Content-Type: {content_type}\r\n'
+                              f'Content-Length: {size}\r\n'
+                              f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode())
+
+                if method != 'HEAD':
+                    if not isinstance(body, int):
+                        writer.write(body)
+                    elif self.use_sendfile:
+                        await loop.sendfile(writer.transport, self.payload_file, 0, size)
+                    else:
+                        writer.write(self.payload[:size])
+                await writer.drain()
+
+                self.requests += 1
+                self.sent_bytes += size
+
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=1024)
+        self.start_time = time.perf_counter()
+        print(f'> Origin server listening on http://{self.host}:{self.port}/ '
+              f'({self.index.get_segments()} segments, {len(self.index.bandwidths)} representations)')
+        # stopped by Ctrl+C or kill, printing the statistics
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, server.close)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def print_statistics(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0
+        print(f'> Origin server: {self.requests} requests in {self.connections} connections, '
+              f'{self.sent_bytes} bytes sent')
+        if elapsed > 0:
+            print(f'  >> {round(self.requests / elapsed, 1)} requests/s, '
+                  f'{round(8 * self.sent_bytes / elapsed / 1e6, 1)} Mbps')
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.print_statistics()
+            self.payload_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local DASH origin server with synthetic segments')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--index', help='.npz segment size index (see SegmentSizeIndex.save)')
+    parser.add_argument('--segments', type=int, default=596, help='segments of the synthetic index')
+    parser.add_argument('--variation', type=float, default=0.2, help='size variation of the synthetic index')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.index:
+        index = SegmentSizeIndex.load(args.index)
+    else:
+        index = SegmentSizeIndex.synthetic(segments=args.segments, variation=args.variation, seed=args.seed)
+
+    OriginServer(index, args.host, args.port).run()
+
+
+if __name__ == '__main__':
+    main()
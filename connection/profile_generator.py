@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Markov chain generator of traffic shaping profiles
+(traffic_shaping_profile = markov).
+
+The link moves among the states L, M and H following a discrete time
+Markov chain with one transition every step seconds. While in a state the
+bandwidth of each step is the state rate (derived from the mpd, as in the
+sequence profile) times a sample of the state distribution:
+    exponential - loc + scale * Exp(1)
+    lognormal   - exp(N(mean, sigma))
+    pareto      - scale * (1 + Lomax(shape)), the Pareto distribution of minimum scale
+
+The chain is generated over its jumps (geometric holding times drawn from
+the same uniforms), and every state draws all its samples in a single
+vectorized call. The profile is stored as a trace file (see
+trace_profile.py) in the cache directory, keyed by the seed, the chain
+parameters and the state rates, so it is generated only once.
+"""
+
+import math
+import os
+
+import numpy as np
+
+from base.cache import cache_file
+from connection.trace_profile import TraceProfile
+
+STATES = ('L', 'M', 'H')
+
+
+def exponential(random, size, loc=0.0, scale=1.0):
+    return loc + scale * random.standard_exponential(size)
+
+
+def lognormal(random, size, mean=0.0, sigma=1.0):
+    return random.lognormal(mean, sigma, size)
+
+
+def pareto(random, size, shape=3.0, scale=1.0):
+    return scale * (1 + random.pareto(shape, size))
+
+
+DISTRIBUTIONS = {'exponential': exponential, 'lognormal': lognormal, 'pareto': pareto}
+
+
+class MarkovProfileGenerator:
+
+    # uniforms drawn at once while the chain jumps are generated
+    block_size = 4096
+
+    def __init__(self, transitions, distributions, step, duration, seed, config_parser=None):
+        """
+        transitions:   3x3 transition matrix among L, M and H (rows sum to 1)
+        distributions: {state: [distribution name, {parameters}]}
+        step:          seconds between transitions (and samples)
+        duration:      profile length (s), it is repeated after its end
+        config_parser: configuration of the cache directory
+        """
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        if self.transitions.shape != (len(STATES), len(STATES)) or not np.allclose(self.transitions.sum(axis=1), 1):
+            raise ValueError('traffic_shaping_markov_transitions should be a 3x3 matrix with rows summing 1')
+
+        self.distributions = []
+        for state in STATES:
+            name, parameters = distributions[state]
+            if name not in DISTRIBUTIONS:
+                raise ValueError(f'Invalid distribution for the state {state} - {name}')
+            self.distributions.append((name, dict(parameters)))
+
+        self.step = float(step)
+        self.duration = float(duration)
+        self.seed = seed
+        self.config_parser = config_parser
+
+    def get_cache_key(self, rates):
+        return {'transitions': self.transitions.tolist(), 'distributions': self.distributions, 'step': self.step,
+                'duration': self.duration, 'seed': self.seed, 'rates': [float(rate) for rate in rates]}
+
+    def get_profile(self, rates):
+        """
+        Returns the TraceProfile of the state rates (bps of L, M and H),
+        generating it if it is not in the cache yet.
+        """
+        path = cache_file('profiles', self.get_cache_key(rates), 'trace', self.config_parser)
+        if not os.path.exists(path):
+            TraceProfile.write(path, self.generate(rates), self.step)
+        return TraceProfile(path)
+
+    def generate(self, rates):
+        random = np.random.default_rng(self.seed)
+        size = max(int(round(self.duration / self.step)), 1)
+        states = self.generate_states(random, size)
+
+        samples = np.empty(size)
+        for state, (name, parameters) in enumerate(self.distributions):
+            mask = states == state
+            samples[mask] = rates[state] * DISTRIBUTIONS[name](random, int(mask.sum()), **parameters)
+
+        return samples
+
+    def generate_states(self, random, size):
+        """
+        State of each step. The chain stays in state i for a geometric number
+        of steps (1 - P[i][i]) and then jumps to j != i with probability
+        P[i][j] / (1 - P[i][i]).
+        """
+        stay = np.diag(self.transitions)
+        jumps = self.transitions * (1 - np.eye(len(STATES)))
+        jumps = np.cumsum(jumps / np.maximum(jumps.sum(axis=1, keepdims=True), 1e-300), axis=1).tolist()
+        # log of the probability of staying, None for absorbing states
+        log_stay = [math.log(p) if 0 < p < 1 else (None if p >= 1 else -math.inf) for p in stay.tolist()]
+
+        # initial state from the stationary distribution
+        values, vectors = np.linalg.eig(self.transitions.T)
+        stationary = np.abs(np.real(vectors[:, np.argmin(np.abs(values - 1))]))
+        state = int(np.searchsorted(np.cumsum(stationary / stationary.sum()), random.random(), side='right'))
+        state = min(state, len(STATES) - 1)
+
+        visited, holding = [], []
+        total = 0
+        while total < size:
+            for u_hold, u_jump in random.random((self.block_size, 2)).tolist():
+                if log_stay[state] is None:
+                    steps = size - total
+                else:
+                    steps = 1 + int(math.log1p(-u_hold) / log_stay[state])
+                visited.append(state)
+                holding.append(steps)
+                total += steps
+                if total >= size:
+                    break
+
+                row = jumps[state]
+                state = next((j for j, p in enumerate(row) if u_jump < p), len(STATES) - 1)
+
+        return np.repeat(np.array(visited, dtype=np.int8), holding)[:size]
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Compact index of the segment sizes of a DASH presentation.
+
+The size (bytes) of every (segment, representation) pair is kept in a
+single uint32 NumPy array, the only data needed to emulate a presentation:
+the local origin server (origin_server.py) serves bodies of these sizes
+and the MPD is written from the representation bandwidths.
+
+The index is either synthetic (the sizes vary around bandwidth * duration
+/ 8 as in an encoded video) or built once from the MPD and the segment
+files of a local dataset and stored in a .npz file (with the MPD itself):
+
+    python -m connection.segment_index dataset/BigBuckBunny_1s.mpd dataset/ bbb_1s.npz
+"""
+
+import os
+import re
+import sys
+
+import numpy as np
+
+from player.parser import parse_mpd
+
+# representations of the BigBuckBunny 1s dataset used by pyDash (bps)
+BIG_BUCK_BUNNY_BANDWIDTHS = (46980, 91917, 135410, 182366, 226106, 270316, 352546, 424520, 537825, 620705,
+                             808057, 1071529, 1312787, 1662809, 2234145, 2617284, 3305118, 3841983, 4242923,
+                             4726737)
+
+MEDIA = 'bunny_$Bandwidth$bps/BigBuckBunny_1s$Number$.m4s'
+INITIALIZATION = 'bunny_$Bandwidth$bps/BigBuckBunny_1s_init.mp4'
+
+
+def template_pattern(template):
+    """
+    Regular expression of the urls of a SegmentTemplate attribute.
+    """
+    pattern = re.escape(template)
+    pattern = pattern.replace(re.escape('$Bandwidth$'), r'(?P<bandwidth>\d+)')
+    pattern = pattern.replace(re.escape('$Number$'), r'(?P<number>\d+)')
+    return re.compile(pattern + '$')
+
+
+class SegmentSizeIndex:
+
+    def __init__(self, bandwidths, sizes, segment_duration=1, mpd=None):
+        """
+        bandwidths:       representation bandwidths (bps), ascending
+        sizes:            sizes (bytes) of shape (segments, representations)
+        segment_duration: seconds of each segment
+        mpd:              MPD of the dataset, None to write one like the
+                          BigBuckBunny MPD
+        """
+        self.bandwidths = np.asarray(bandwidths, dtype=np.int64)
+        self.sizes = np.ascontiguousarray(sizes, dtype=np.uint32)
+        self.segment_duration = segment_duration
+        self.mpd = mpd
+
+        self.media, self.initialization = MEDIA, INITIALIZATION
+        if mpd is not None:
+            segment_template = parse_mpd(mpd).get_segment_template()
+            self.media = segment_template['media']
+            self.initialization = segment_template.get('initialization', '')
+
+        if self.sizes.ndim != 2 or self.sizes.shape[1] != len(self.bandwidths):
+            raise ValueError('The segment sizes should have one column per representation')
+        if np.any(np.diff(self.bandwidths) <= 0):
+            raise ValueError('The representation bandwidths should be ascending')
+
+        # quality_id (bandwidth) -> column
+        self.columns = {int(bandwidth): column for column, bandwidth in enumerate(self.bandwidths)}
+
+    @classmethod
+    def synthetic(cls, bandwidths=BIG_BUCK_BUNNY_BANDWIDTHS, segments=596, segment_duration=1, variation=0.2, seed=1):
+        """
+        Sizes of mean bandwidth * segment_duration / 8 with a lognormal
+        variation along the segments, the same for every representation
+        (a complex scene is larger in every quality).
+        """
+        random = np.random.default_rng(seed)
+        complexity = random.lognormal(-variation ** 2 / 2, variation, size=(segments, 1))
+        sizes = np.asarray(bandwidths, dtype=np.float64) * segment_duration / 8 * complexity
+        return cls(bandwidths, np.maximum(np.round(sizes), 1), segment_duration)
+
+    @classmethod
+    def from_dataset(cls, mpd, directory):
+        """
+        Sizes of the segment files of a dataset, laid out in directory as in
+        the SegmentTemplate of the MPD (text). The segments are numbered
+        from 1 (as requested by the Player) while the file of the first
+        representation exists.
+        """
+        parsed_mpd = parse_mpd(mpd)
+        bandwidths = parsed_mpd.get_qi()
+        segment_template = parsed_mpd.get_segment_template()
+        media = segment_template['media']
+        segment_duration = int(segment_template['duration']) / int(segment_template.get('timescale', 1))
+
+        def segment_path(number, bandwidth):
+            return os.path.join(directory, media.replace('$Bandwidth$', str(bandwidth)).replace('$Number$', str(number)))
+
+        numbers = []
+        while os.path.exists(segment_path(len(numbers) + 1, bandwidths[0])):
+            numbers.append(len(numbers) + 1)
+        if not numbers:
+            raise ValueError(f'No segment of {media} found in {directory}')
+
+        sizes = [[os.path.getsize(segment_path(number, bandwidth)) for bandwidth in bandwidths] for number in numbers]
+        return cls(bandwidths, sizes, segment_duration, mpd)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            mpd = str(data['mpd']) if 'mpd' in data else None
+            return cls(data['bandwidths'], data['sizes'], float(data['segment_duration']), mpd)
+
+    def save(self, path):
+        data = {'bandwidths': self.bandwidths, 'sizes': self.sizes, 'segment_duration': self.segment_duration}
+        if self.mpd is not None:
+            data['mpd'] = self.mpd
+        np.savez(path, **data)
+
+    def get_segments(self):
+        return len(self.sizes)
+
+    def get_max_size(self):
+        return int(self.sizes.max())
+
+    def get_size(self, segment_id, quality_id):
+        """
+        Size (bytes) of the segment (1 based, as in the MPD) in the
+        representation of bandwidth quality_id, or None when it does not
+        exist.
+        """
+        column = self.columns.get(quality_id)
+        if column is None or not 1 <= segment_id <= len(self.sizes):
+            return None
+        return int(self.sizes[segment_id - 1, column])
+
+    def get_mpd(self, title='BigBuckBunny'):
+        """
+        MPD of the presentation: the one of the dataset or one in the layout
+        of the BigBuckBunny MPD.
+        """
+        if self.mpd is not None:
+            return self.mpd
+
+        duration = self.get_segments() * self.segment_duration
+        minutes, seconds = divmod(duration, 60)
+        hours, minutes = divmod(int(minutes), 60)
+        period = f'PT{hours}H{minutes}M{seconds:.3f}S'
+        timescale = 96
+
+        representations = '\n'.join(
+            f'      <Representation id="{title}_{bandwidth}bps" mimeType="video/mp4" codecs="avc1.42c00d" '
+            f'width="480" height="360" frameRate="24" sar="1:1" startWithSAP="1" bandwidth="{bandwidth}"/>'
+            for bandwidth in self.bandwidths)
+
+        return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" minBufferTime="PT1.500000S" type="static" '
+                f'mediaPresentationDuration="{period}" profiles="urn:mpeg:dash:profile:isoff-live:2011">\n'
+                f'  <ProgramInformation moreInformationURL="http://gpac.sourceforge.net">\n'
+                f'    <Title>{title}</Title>\n'
+                f'  </ProgramInformation>\n'
+                f'  <Period duration="{period}">\n'
+                f'    <AdaptationSet segmentAlignment="true" group="1" maxWidth="480" maxHeight="360" '
+                f'maxFrameRate="24" par="4:3">\n'
+                f'      <SegmentTemplate timescale="{timescale}" media="{self.media}" startNumber="1" '
+                f'duration="{int(self.segment_duration * timescale)}" initialization="{self.initialization}"/>\n'
+                f'{representations}\n'
+                f'    </AdaptationSet>\n'
+                f'  </Period>\n'
+                f'</MPD>\n')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print(f'usage: python -m connection.segment_index <mpd file> <dataset directory> <index.npz>')
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        index = SegmentSizeIndex.from_dataset(f.read(), sys.argv[2])
+    index.save(sys.argv[3])
+    print(f'> {index.get_segments()} segments of {len(index.bandwidths)} representations, '
+          f'{index.sizes.nbytes} bytes of index')
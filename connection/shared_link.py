@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Bottleneck link shared by the clients of a multi-client session
+(multi_client.py), in the virtual time mode.
+
+The capacity (bps) is given by a profile, as in the traffic shaper
+(interval and get_throughput(time)), times a scale, usually the number of
+clients. It is divided equally among the transfers in progress (processor
+sharing), so each flow gets capacity / n while n transfers are active.
+
+Instead of the remaining bits of every flow, the link keeps the service, the
+bits received by any flow that was active since the start. A transfer of b
+bits started when the service was s ends when the service reaches s + b, so
+the flows finish in the order of s + b (a heap) and a start or an end costs
+O(log n) whatever the number of flows. A single timer callback is pending
+at a time, for the next end of transfer or the end of the profile interval.
+"""
+
+import heapq
+import itertools
+
+from base.timer import Timer
+
+
+class SharedLink:
+
+    def __init__(self, scale=1.0, timer=None):
+        """
+        scale: multiplies the throughput of the profile
+        timer: simulated clock of the session (virtual time mode)
+        """
+        if not scale > 0:
+            raise ValueError(f'Invalid capacity scale parameter - {scale}')
+
+        self.scale = scale
+        self.timer = timer or Timer.get_instance()
+        self.profile = None
+
+        # (service at the end, sequence, callback) of the transfers in progress
+        self.flows = []
+        self.sequence = itertools.count()
+        self.service = 0.0
+        self.time = 0.0
+
+        # only the last scheduled callback is valid
+        self.generation = 0
+
+        # for the statistics purpose
+        self.transfers = 0
+        self.transferred_bits = 0
+        self.busy_time = 0.0
+        self.max_flows = 0
+
+    def set_profile(self, profile):
+        self.profile = profile
+
+    def has_profile(self):
+        return self.profile is not None
+
+    def get_capacity(self, time):
+        return self.scale * max(self.profile.get_throughput(time), 0.0)
+
+    def get_active_flows(self):
+        return len(self.flows)
+
+    def start_transfer(self, bits, callback):
+        """
+        Starts a transfer of bits, callback() is called by the timer when
+        it ends.
+        """
+        if self.profile is None:
+            raise ValueError('The shared link has no profile')
+
+        self.__advance(self.timer.perf_counter())
+        heapq.heappush(self.flows, (self.service + max(bits, 0), next(self.sequence), callback))
+
+        self.transfers += 1
+        self.transferred_bits += bits
+        self.max_flows = max(self.max_flows, len(self.flows))
+        self.__schedule()
+
+    def get_statistics(self):
+        return {
+            'transfers': self.transfers,
+            'transferred_bits': self.transferred_bits,
+            'busy_time': self.busy_time,
+            'max_flows': self.max_flows,
+        }
+
+    def __interval_end(self, time):
+        interval = self.profile.interval
+        end = (time // interval + 1) * interval
+        # time may be rounded just below an interval boundary
+        return end if end > time else end + interval
+
+    def __advance(self, now):
+        # service of every active flow from the last update until now, interval by interval
+        if self.flows and now > self.time:
+            self.busy_time += now - self.time
+            while self.time < now:
+                end = min(self.__interval_end(self.time), now)
+                self.service += self.get_capacity(self.time) * (end - self.time) / len(self.flows)
+                self.time = end
+
+        self.time = now
+
+    def __schedule(self):
+        self.generation += 1
+        if not self.flows:
+            return
+
+        # the next end of transfer if it happens in the current interval, otherwise the interval end
+        rate = self.get_capacity(self.time) / len(self.flows)
+        end = self.__interval_end(self.time)
+        missing = self.flows[0][0] - self.service
+        deadline = self.time + missing / rate if rate > 0 else end
+
+        generation = self.generation
+        self.timer.call_later(min(deadline, end) - self.timer.perf_counter(), lambda: self.__update(generation))
+
+    def __update(self, generation):
+        if generation != self.generation:
+            return
+
+        self.__advance(self.timer.perf_counter())
+
+        # ends every transfer already served, a relative tolerance absorbs the rounding of the service
+        finished = []
+        while self.flows and self.flows[0][0] <= self.service + 1e-9 * max(self.service, 1.0):
+            finished.append(heapq.heappop(self.flows)[2])
+
+        self.__schedule()
+        for callback in finished:
+            callback()
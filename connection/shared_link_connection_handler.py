@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+ConnectionHandler of the clients of a multi-client session (multi_client.py).
+
+The responses come from a SegmentSizeIndex, as in the simulation mode, but
+the bodies are not shaped chunk by chunk: each one is a transfer of the
+SharedLink (shared_link.py), the bottleneck of all the clients, and the
+response is sent up when the transfer ends. The request returns at once, so
+many clients can download at the same time in a single event loop. The
+segment download abandonment is not available in this mode.
+"""
+
+import http.client
+
+from base.message import Message, MessageKind
+from connection.simulated_connection_handler import SimulatedConnectionHandler
+from player.parser import parse_mpd
+
+
+class SharedLinkConnectionHandler(SimulatedConnectionHandler):
+
+    def __init__(self, id, context, link, index=None):
+        SimulatedConnectionHandler.__init__(self, id, context, index)
+        self.link = link
+
+    def handle_xml_request(self, msg):
+        mpd = self.mpd.decode()
+        msg = Message(MessageKind.XML_RESPONSE, mpd)
+        msg.add_bit_length(8 * len(mpd))
+        self.simulated_requests += 1
+
+        self.qi = parse_mpd(mpd).get_qi()
+
+        # the capacity of the link follows the traffic shaping parameters of the first client
+        if not self.link.has_profile():
+            if self.traffic_shaping_profile == 'trace':
+                self.link.set_profile(self.traffic_shaper.profile)
+            else:
+                self.link.set_profile(self.create_traffic_shaping_profile())
+
+        self.link.start_transfer(msg.get_bit_length(), lambda: self.send_up(msg))
+
+    def handle_segment_size_request(self, msg):
+        host_name, port = self.split_host(msg.get_host_name())
+        self.download_samples.append(self.timer.get_current_time(), 0)
+
+        print(f'Execution Time {self.timer.get_current_time()} > selected QI: {self.qi.index(msg.get_quality_id())}')
+
+        _, response = self.request(host_name, port, msg.get_url())
+
+        def received():
+            # the whole body in a single download sample
+            self.download_samples.append(self.timer.get_current_time(), response.length)
+
+            msg.set_kind(MessageKind.SEGMENT_RESPONSE)
+            if response.status != http.client.OK:
+                msg.set_found(False)
+            else:
+                msg.add_bit_length(8 * response.length)
+
+            self.send_up(msg)
+
+        self.link.start_transfer(8 * response.length, received)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+ConnectionHandler of the pure simulation mode (connection_handler =
+simulation in dash_client.json).
+
+The Player and the R2A only use the size of a segment response, so the
+requests are answered from a SegmentSizeIndex (segment_index.py) instead of
+an HTTP server: the index given by the segment_index parameter (a .npz
+file) or, when it is empty, the synthetic BigBuckBunny index. There is no
+network I/O and no body is stored, the transfer time is given by the
+traffic shaper, chunk by chunk, as in the ConnectionHandler. Along with the
+virtual_time, a session takes only the time of the R2A decisions.
+"""
+
+import http.client
+
+from connection.connection_handler import ConnectionHandler
+from connection.origin_server import NOT_FOUND
+from connection.segment_index import SegmentSizeIndex, template_pattern
+
+
+class SimulatedResponse:
+    """
+    The part of the http.client.HTTPResponse used by the ConnectionHandler.
+    The body is only counted, readinto() does not touch the buffer.
+    """
+
+    def __init__(self, status, length, body=b''):
+        self.status = status
+        # bytes not read yet, as in the HTTPResponse
+        self.length = length
+        self.body = body
+
+    def read(self):
+        self.length = 0
+        return self.body
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.length)
+        self.length -= length
+        return length
+
+
+class SimulatedConnectionHandler(ConnectionHandler):
+
+    def __init__(self, id, context=None, index=None):
+        ConnectionHandler.__init__(self, id, context)
+
+        # an index may be shared by the handlers of several clients
+        path = self.context.get_parameter('segment_index')
+        self.index = index or (SegmentSizeIndex.load(path) if path else SegmentSizeIndex.synthetic())
+        self.mpd = self.index.get_mpd().encode()
+        self.media_pattern = template_pattern(self.index.media)
+
+        # for the statistics purpose
+        self.simulated_requests = 0
+
+    def request(self, host_name, port, path_name):
+        self.simulated_requests += 1
+
+        if path_name.endswith('.mpd'):
+            return None, SimulatedResponse(http.client.OK, len(self.mpd), self.mpd)
+
+        match = self.media_pattern.search(path_name)
+        size = self.index.get_size(int(match['number']), int(match['bandwidth'])) if match else None
+        if size is None:
+            # the 404 page of the local origin server, its transfer also takes time
+            return None, SimulatedResponse(http.client.NOT_FOUND, len(NOT_FOUND), NOT_FOUND)
+
+        return None, SimulatedResponse(http.client.OK, size)
+
+    def release(self, connection, response):
+        pass
+
+    def finalization(self):
+        print(f'> Simulated connection: {self.simulated_requests} requests, '
+              f'{self.index.get_segments()} segments of {len(self.index.bandwidths)} representations in the index')
+        ConnectionHandler.finalization(self)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Bandwidth traces for the traffic shaper (traffic_shaping_profile = trace).
+
+A trace is stored in a compact binary file: a 16 bytes header (the magic
+PDTRACE1 and the sampling step in seconds as a float64) followed by the
+bandwidth samples (bps) as float32. The file is memory-mapped, so the
+lookup by time is a single index and concurrent sessions share the pages
+of the same trace instead of each one loading it in memory.
+
+CSV traces are converted once to this format in the cache directory. The
+CSV has one sample per line, either "time, bandwidth" (time in seconds,
+any spacing, each sample holds until the next one) or only "bandwidth"
+(one sample each step). Lines starting with # and a header line are
+skipped. The trace is repeated when the session outlasts it.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from base.cache import cache_file, write_file
+
+
+class TraceProfile:
+
+    magic = b'PDTRACE1'
+    header = struct.Struct('<8sd')
+
+    def __init__(self, path, scale=1.0):
+        """
+        Memory-maps a binary trace file. scale multiplies the samples (e.g.
+        1000 for traces in kbps).
+        """
+        with open(path, 'rb') as f:
+            magic, step = self.header.unpack(f.read(self.header.size))
+        if magic != self.magic:
+            raise ValueError(f'{path} is not a trace file')
+
+        if not scale > 0:
+            raise ValueError(f'Invalid traffic_shaping_trace_scale parameter - {scale}')
+
+        self.path = path
+        self.interval = step
+        self.scale = scale
+        self.samples = np.memmap(path, dtype='<f4', mode='r', offset=self.header.size)
+
+        if len(self.samples) == 0 or not self.samples.max() > 0:
+            raise ValueError(f'Trace {path} has no bandwidth samples')
+
+        self.duration = len(self.samples) * step
+
+    @classmethod
+    def open(cls, path, step=0.1, scale=1.0, config_parser=None):
+        """
+        Opens a binary trace or a CSV trace, converted (sampled every step
+        seconds) to the binary format on its first use.
+        """
+        if not path.lower().endswith('.csv'):
+            return cls(path, scale)
+
+        stat = os.stat(path)
+        trace_path = cache_file('traces', {'path': os.path.abspath(path), 'size': stat.st_size,
+                                           'mtime': stat.st_mtime, 'step': step}, 'trace', config_parser)
+        if not os.path.exists(trace_path):
+            cls.convert_csv(path, trace_path, step)
+
+        return cls(trace_path, scale)
+
+    @classmethod
+    def write(cls, path, samples, step):
+        # written aside and renamed, concurrent sessions never read a partial file
+        with write_file(path) as f:
+            f.write(cls.header.pack(cls.magic, step))
+            f.write(np.asarray(samples, dtype='<f4').tobytes())
+
+    @classmethod
+    def convert_csv(cls, csv_path, trace_path, step):
+        with open(csv_path) as f:
+            first_line = f.readline()
+        try:
+            [float(value) for value in first_line.split(',')]
+            skip_rows = 0
+        except ValueError:
+            # header line
+            skip_rows = 1
+
+        data = np.loadtxt(csv_path, delimiter=',', comments='#', skiprows=skip_rows, ndmin=2)
+
+        if data.shape[1] == 1:
+            samples = data[:, 0]
+        else:
+            # sample and hold of the (time, bandwidth) pairs over a regular grid
+            times, bandwidths = data[:, 0] - data[0, 0], data[:, 1]
+            grid = np.arange(0, times[-1] + step, step)
+            samples = bandwidths[np.maximum(np.searchsorted(times, grid, side='right') - 1, 0)]
+
+        cls.write(trace_path, samples, step)
+
+    def get_throughput(self, time):
+        return float(self.samples[int(time // self.interval) % len(self.samples)]) * self.scale
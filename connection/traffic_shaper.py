@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Token bucket traffic shaper used by the ConnectionHandler while the
+response bodies are read.
+
+The target throughput (bps) is given by a profile, piecewise constant over
+intervals of profile.interval seconds of the execution time:
+    SequenceProfile - the traffic_shaping_profile_sequence of L, M and H
+                      levels (this module)
+    TraceProfile    - a bandwidth trace file (trace_profile.py)
+The bucket starts empty and is filled at the target throughput up to
+bucket_size bits.
+Every chunk received takes its bits from the bucket and, when they are
+missing, the shaper sleeps until the bucket would have collected them. So
+the transfer itself runs at the target throughput, with bursts of at most
+bucket_size bits.
+
+Each consume() costs O(1) besides the profile intervals the chunk crosses.
+The intervals without throughput (0 bps, or negative samples of a trace)
+are skipped, and a whole profile duration (the profiles repeat after it)
+without throughput is an error instead of an endless wait.
+"""
+
+import math
+
+from base.timer import Timer
+
+
+class SequenceProfile:
+    """
+    The interval i uses the level sequence[i % len(sequence)] (0 - L, 1 - M,
+    2 - H) and the value i of that level.
+    """
+
+    def __init__(self, sequence, interval, values):
+        self.sequence = sequence
+        self.interval = interval
+        self.values = [[float(value) for value in level] for level in values]
+        # the throughputs repeat after this time
+        self.duration = interval * math.lcm(len(sequence), *[len(level) for level in self.values])
+
+    def get_throughput(self, time):
+        index = int(time // self.interval)
+        values = self.values[self.sequence[index % len(self.sequence)]]
+        return values[index % len(values)]
+
+
+class TrafficShaper:
+
+    def __init__(self, bucket_size, timer=None):
+        """
+        bucket_size: maximum burst (bits)
+        timer:       clock of the session, the process-wide Timer by default
+        """
+        self.bucket_size = bucket_size
+        self.timer = timer or Timer.get_instance()
+
+        # the traffic is not shaped until a profile is set, the bucket starts empty
+        self.profile = None
+        self.tokens = 0.0
+        self.time = 0.0
+
+        # for the statistics purpose
+        self.shaped_bits = 0
+        self.waiting_time = 0.0
+
+    def set_profile(self, profile):
+        self.profile = profile
+        self.time = self.timer.get_current_time()
+
+    def get_target_throughput(self, time):
+        return max(self.profile.get_throughput(time), 0.0)
+
+    def consume(self, bits):
+        """
+        Takes bits from the bucket, sleeping while they are not available.
+        It returns the waiting time (s).
+        """
+        if self.profile is None or bits <= 0:
+            return 0.0
+
+        now = self.timer.get_current_time()
+        self.__fill(now)
+        self.shaped_bits += bits
+
+        if self.tokens >= bits:
+            self.tokens -= bits
+            return 0.0
+
+        # time when the missing bits are collected, crossing intervals if needed
+        missing = bits - self.tokens
+        time = self.time
+        # time spent in a row in intervals without throughput
+        idle_time = 0.0
+        while True:
+            target_throughput = self.get_target_throughput(time)
+            end = self.__interval_end(time)
+            if target_throughput == 0:
+                idle_time += end - time
+                if idle_time >= self.profile.duration:
+                    raise ValueError(f'Invalid traffic shaping profile - no throughput from {round(end - idle_time, 6)} s '
+                                     f'over its whole duration ({self.profile.duration} s)')
+            elif target_throughput * (end - time) >= missing:
+                time += missing / target_throughput
+                break
+            else:
+                idle_time = 0.0
+                missing -= target_throughput * (end - time)
+            time = end
+
+        self.tokens = 0.0
+        self.time = time
+
+        waiting_time = time - now
+        self.waiting_time += waiting_time
+        self.timer.sleep(waiting_time)
+        return waiting_time
+
+    def __interval_end(self, time):
+        interval = self.profile.interval
+        end = (time // interval + 1) * interval
+        # time may be rounded just below an interval boundary
+        return end if end > time else end + interval
+
+    def __fill(self, now):
+        # tokens collected from the last update until now, interval by interval
+        while self.time < now and self.tokens < self.bucket_size:
+            end = min(self.__interval_end(self.time), now)
+            self.tokens = min(self.tokens + self.get_target_throughput(self.time) * (end - self.time), self.bucket_size)
+            self.time = end
+
+        self.time = max(self.time, now)
@@ -13,46 +13,74 @@ responsible to make the communication among them happens.
 
 import importlib
 
-from base.configuration_parser import ConfigurationParser
-from base.scheduler import Scheduler
+from base.session_context import SessionContext
+from base.session_log import SessionRecorder
+from base.simple_module import SimpleModule
 from connection.connection_handler import ConnectionHandler
+from connection.simulated_connection_handler import SimulatedConnectionHandler
 from player.player import Player
 
 
 class DashClient:
 
-    def __init__(self):
-        config_parser = ConfigurationParser.get_instance()
+    def __init__(self, context=None):
+        # configuration, timer, whiteboard and scheduler of the session, the singletons by default
+        self.context = context or SessionContext.get_default()
+        config_parser = self.context.config_parser
 
         r2a_algorithm = str(config_parser.get_parameter('r2a_algorithm'))
 
-        self.scheduler = Scheduler()
+        self.scheduler = self.context.scheduler
 
         self.modules = []
 
         # adding modules to manage
-        self.player = Player(0)
+        self.player = Player(0, self.context)
 
         # automatic loading class by the name
         r2a_class = getattr(importlib.import_module('r2a.' + r2a_algorithm.lower()), r2a_algorithm)
-        self.r2a = r2a_class(1)
-
-        self.connection_handler = ConnectionHandler(2)
+        self.r2a = r2a_class(1, self.context)
+
+        # http: segments downloaded from the url_mpd server, simulation: segment sizes from an index
+        connection_handler = str(config_parser.get_parameter('connection_handler'))
+        if connection_handler == 'http':
+            self.connection_handler = ConnectionHandler(2, self.context)
+        elif connection_handler == 'simulation':
+            self.connection_handler = SimulatedConnectionHandler(2, self.context)
+        else:
+            raise ValueError(f'Invalid connection_handler parameter - {connection_handler}')
+        # the R2A may abandon a segment download in progress
+        self.connection_handler.set_download_progress_callback(self.r2a.handle_segment_download_progress)
 
         self.modules.append(self.player)
         self.modules.append(self.r2a)
         self.modules.append(self.connection_handler)
 
+        # every event and the network conditions of the session are written to a log to be replayed
+        session_record = str(config_parser.get_parameter('session_record'))
+        self.recorder = None
+        if session_record:
+            self.recorder = SessionRecorder(session_record, config_parser.config_parameters, self.context.timer)
+
 
     def run_application(self):
         self.modules_initialization()
 
-        while not self.scheduler.is_empty():
-            event = self.scheduler.get_event()
-            self.handle_scheduler_event(event)
+        while True:
+            if not self.scheduler.is_empty():
+                event = self.scheduler.get_event()
+                if self.recorder is not None:
+                    self.recorder.record(event)
+                self.handle_scheduler_event(event)
+            # virtual time mode: without events, the clock moves to the next timer callback (playback)
+            elif not self.context.timer.run_next_callback():
+                break
 
         self.modules_finalization()
 
+        if self.recorder is not None:
+            self.recorder.save(self.context.whiteboard.get_download_samples())
+
 
     def handle_scheduler_event(self, event):
 
@@ -68,11 +96,11 @@ class DashClient:
     def modules_initialization(self):
         print('Initialization modules phase.')
         for m in self.modules:
-            super(type(m), m).initialize()
+            SimpleModule.initialize(m)
             m.initialize()
 
     def modules_finalization(self):
         print('Finalization modules phase.')
         for m in self.modules:
-            super(type(m), m).finalization()
+            SimpleModule.finalization(m)
             m.finalization()
\ No newline at end of file
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Runs a grid of sessions in parallel, one session per process:
+
+    python3 grid.py grid.json --results grid.csv --workers 8
+
+grid.json has the lists of values of each parameter of the grid and the
+parameters fixed in every session, both over the dash_client.json of the
+current directory:
+
+    {
+      "grid": {
+        "r2a_algorithm": ["R2A_FDASH", "R2A_FDASH_2"],
+        "traffic_shaping_profile_sequence": ["LH", "HML"],
+        "traffic_shaping_seed": [1, 2, 3],
+        "max_buffer_size": [30, 60]
+      },
+      "parameters": {"virtual_time": true}
+    }
+
+Every combination is a run, identified by the hash of its parameters. The
+run is executed in its own directory (runs/<run id>, with its
+dash_client.json, results and output) by a worker process created for that
+run only, as the modules are singletons. The QoE summary of each run is
+appended to the results table (CSV) as soon as it completes, and the runs
+already in the table are skipped, so an interrupted grid is resumed by
+running the same command again.
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+from base.cache import cache_key
+from dash_client import DashClient
+
+STATISTICS = ('pauses_number', 'average_pause', 'average_qi', 'qi_stdev', 'average_qi_distance',
+              'qi_distance_stdev')
+
+
+def expand_grid(grid):
+    """
+    Parameters of every combination of the grid, in a stable order.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_session(task):
+    """
+    Executes a session in its run directory (in a worker process) and
+    returns the run id and parameters, its status, the Player statistics
+    and the elapsed time.
+    """
+    run_id, run, run_directory, configuration = task
+    start = time.perf_counter()
+    os.makedirs(os.path.join(run_directory, 'results'), exist_ok=True)
+    os.chdir(run_directory)
+    with open('dash_client.json', 'w') as f:
+        json.dump(configuration, f, indent=2)
+
+    with open('output.txt', 'w') as output, contextlib.redirect_stdout(output):
+        try:
+            # the modules read the dash_client.json of the run directory
+            dash_client = DashClient()
+            dash_client.run_application()
+            statistics = dash_client.player.get_statistics()
+            status = 'ok'
+        except BaseException:
+            traceback.print_exc(file=output)
+            statistics = {}
+            status = 'error'
+
+    return run_id, run, status, statistics, time.perf_counter() - start
+
+
+def load_completed(results_path):
+    """
+    Run ids already completed in the results table.
+    """
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        return set()
+
+    with open(results_path, newline='') as f:
+        return {row['run_id'] for row in csv.DictReader(f) if row['status'] == 'ok'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a grid of pyDash sessions in parallel')
+    parser.add_argument('grid', help='JSON file with the grid and the fixed parameters')
+    parser.add_argument('--results', default='grid.csv', help='results table (CSV), also used to resume')
+    parser.add_argument('--runs', default='runs', help='directory of the run directories')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parallel sessions')
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid_file = json.load(f)
+    with open('dash_client.json') as f:
+        base_configuration = json.load(f)
+    base_configuration.update(grid_file.get('parameters', {}))
+    # the runs share the caches (fuzzy engines, traces...) of the current directory
+    base_configuration['cache_directory'] = os.path.abspath(base_configuration['cache_directory'])
+
+    runs = expand_grid(grid_file['grid'])
+    names = list(grid_file['grid'])
+    completed = load_completed(args.results)
+    pending = [(cache_key(run)[:12], run) for run in runs if cache_key(run)[:12] not in completed]
+    print(f'> {len(runs)} runs, {len(runs) - len(pending)} already completed, {len(pending)} to run '
+          f'with {args.workers} workers')
+
+    # a fresh process per session, forked from this one where possible, with the R2A modules already imported
+    for r2a_algorithm in {run.get('r2a_algorithm', base_configuration['r2a_algorithm']) for run in runs}:
+        importlib.import_module('r2a.' + r2a_algorithm.lower())
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+    tasks = [(run_id, run, os.path.abspath(os.path.join(args.runs, run_id)), dict(base_configuration, **run))
+             for run_id, run in pending]
+
+    new_table = not os.path.exists(args.results) or os.path.getsize(args.results) == 0
+    with open(args.results, 'a', newline='') as results, context.Pool(args.workers, maxtasksperchild=1) as pool:
+        writer = csv.DictWriter(results, ['run_id', *names, 'status', *STATISTICS, 'elapsed'])
+        if new_table:
+            writer.writeheader()
+
+        start = time.perf_counter()
+        for done, (run_id, run, status, statistics, elapsed) in enumerate(pool.imap_unordered(run_session, tasks), 1):
+            writer.writerow({'run_id': run_id, **run, 'status': status,
+                             **{name: statistics.get(name) for name in STATISTICS}, 'elapsed': round(elapsed, 3)})
+            results.flush()
+            print(f'> [{done}/{len(pending)}] {run_id} {status} in {round(elapsed, 2)} s '
+                  f'(average QI {statistics.get("average_qi")}) - {round(time.perf_counter() - start, 1)} s elapsed')
+
+
+if __name__ == '__main__':
+    main()
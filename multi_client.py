@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Runs several clients in a single process, sharing a bottleneck link:
+
+    python3 multi_client.py 100 --r2a R2A_FDASH R2A_FDASH_2 --results clients.csv
+
+Every client has its own Player, R2A, ConnectionHandler and whiteboard,
+while the event loop and the simulated clock (virtual time) are shared. The
+segments are transfers of a SharedLink (connection/shared_link.py), divided
+equally among the transfers in progress. The segment sizes come from the
+segment_index of dash_client.json (the synthetic BigBuckBunny index when it
+is empty) and the capacity of the link is its traffic shaping profile times
+--capacity-scale, the number of clients by default: each client has, on
+average, the bandwidth of a single session while all of them download.
+
+The modules output goes to --output. The QoE of every client is written to
+the results table (CSV) and the aggregate QoE is printed along with the
+Jain's fairness index of the average quality and of the throughput of the
+clients.
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import json
+import statistics
+import time
+
+import numpy as np
+
+from base.configuration_parser import ConfigurationParser
+from base.scheduler import Scheduler
+from base.session_context import SessionContext
+from base.simple_module import SimpleModule
+from base.timer import Timer
+from base.whiteboard import Whiteboard
+from connection.segment_index import SegmentSizeIndex
+from connection.shared_link import SharedLink
+from connection.shared_link_connection_handler import SharedLinkConnectionHandler
+from player.player import Player
+
+STATISTICS = ('pauses_number', 'pauses_time', 'startup_delay', 'average_qi', 'qi_stdev', 'average_qi_distance',
+              'switches', 'average_quality_id', 'average_throughput', 'downloaded_bits')
+
+
+def jain_index(values):
+    """
+    Jain's fairness index, (sum x)^2 / (n sum x^2): 1 when every client gets
+    the same, 1/n when a single one gets everything.
+    """
+    values = [value for value in values if value is not None]
+    square_sum = sum(value * value for value in values)
+    if square_sum == 0:
+        return None
+    return sum(values) ** 2 / (len(values) * square_sum)
+
+
+class MultiDashClient:
+
+    def __init__(self, clients, parameters, r2a_algorithms, capacity_scale=None, arrival_interval=0.0):
+        """
+        clients:          number of clients
+        parameters:       configuration of the clients (dash_client.json)
+        r2a_algorithms:   R2A classes, assigned to the clients in turn
+        capacity_scale:   multiplies the traffic shaping profile, clients by default
+        arrival_interval: time (s) between the start of two clients
+        """
+        parameters = dict(parameters, virtual_time=True, connection_handler='simulation')
+        config_parsers = {name: ConfigurationParser(dict(parameters, r2a_algorithm=name)) for name in r2a_algorithms}
+
+        # a single clock and event queue for all the clients
+        self.timer = Timer(config_parsers[r2a_algorithms[0]])
+        self.scheduler = Scheduler.create(self.timer)
+        self.link = SharedLink(clients if capacity_scale is None else capacity_scale, self.timer)
+        self.arrival_interval = arrival_interval
+
+        path = parameters['segment_index']
+        index = SegmentSizeIndex.load(path) if path else SegmentSizeIndex.synthetic()
+
+        # the modules of the client i are in the positions 3i (Player), 3i + 1 (R2A) and 3i + 2 (ConnectionHandler),
+        # so send_up() and send_down() reach the modules of the same client
+        self.modules = []
+        self.r2a_algorithms = []
+        for i in range(clients):
+            r2a_algorithm = r2a_algorithms[i % len(r2a_algorithms)]
+            context = SessionContext(config_parsers[r2a_algorithm], self.timer, Whiteboard(), self.scheduler)
+            r2a_class = getattr(importlib.import_module('r2a.' + r2a_algorithm.lower()), r2a_algorithm)
+
+            self.modules.append(Player(3 * i, context))
+            self.modules.append(r2a_class(3 * i + 1, context))
+            self.modules.append(SharedLinkConnectionHandler(3 * i + 2, context, self.link, index))
+            self.r2a_algorithms.append(r2a_algorithm)
+
+        self.start_times = [i * arrival_interval for i in range(clients)]
+
+    def get_clients(self):
+        return len(self.r2a_algorithms)
+
+    def run_application(self):
+        for i, start_time in enumerate(self.start_times):
+            self.timer.call_later(start_time, lambda i=i: self.client_initialization(i))
+
+        while True:
+            if not self.scheduler.is_empty():
+                event = self.scheduler.get_event()
+                self.modules[event.get_dst()].handle_message(event.get_msg())
+            elif not self.timer.run_next_callback():
+                break
+
+    def client_initialization(self, client):
+        for m in self.modules[3 * client:3 * client + 3]:
+            SimpleModule.initialize(m)
+            m.initialize()
+
+    def get_client_statistics(self, client):
+        """
+        QoE summary of a client, the Player statistics and the played
+        quality, startup delay, stall time and throughput.
+        """
+        player = self.modules[3 * client]
+        features = player.whiteboard.get_features()
+        client_statistics = player.get_statistics()
+
+        playback = player.playback.get_items()
+        played = np.flatnonzero(playback[:, 1])
+        quality_ids = player.playback_quality_qi.get_items()[:, 1]
+        throughputs = player.throughput.get_items()[:, 1]
+        download_samples = self.modules[3 * client + 2].download_samples.view()
+
+        client_statistics.update({
+            'pauses_time': features.get_stall_duration(),
+            'startup_delay': float(playback[played[0], 0]) - self.start_times[client] if len(played) else None,
+            'switches': features.get_switch_count(),
+            'average_quality_id': float(quality_ids.mean()) if len(quality_ids) else None,
+            'average_throughput': float(throughputs.mean()) if len(throughputs) else None,
+            'downloaded_bits': int(8 * download_samples[:, 1].sum()),
+        })
+        return client_statistics
+
+    def get_aggregate_statistics(self, clients_statistics):
+        def mean(name):
+            values = [s[name] for s in clients_statistics if s[name] is not None]
+            return statistics.mean(values) if values else None
+
+        link_statistics = self.link.get_statistics()
+        return {
+            'clients': len(clients_statistics),
+            'average_qi': mean('average_qi'),
+            'average_quality_id': mean('average_quality_id'),
+            'average_throughput': mean('average_throughput'),
+            'pauses_number': mean('pauses_number'),
+            'pauses_time': mean('pauses_time'),
+            'startup_delay': mean('startup_delay'),
+            'switches': mean('switches'),
+            'jain_quality_id': jain_index(s['average_quality_id'] for s in clients_statistics),
+            'jain_throughput': jain_index(s['average_throughput'] for s in clients_statistics),
+            'duration': self.timer.get_current_time(),
+            'link_busy_time': link_statistics['busy_time'],
+            'link_transferred_bits': link_statistics['transferred_bits'],
+            'link_max_flows': link_statistics['max_flows'],
+        }
+
+
+def print_aggregate(aggregate):
+    def value(name, digits=2):
+        return None if aggregate[name] is None else round(aggregate[name], digits)
+
+    print(f'> {aggregate["clients"]} clients, {round(aggregate["duration"], 2)} s of session')
+    print(f'  >> Average QI: {value("average_qi")}')
+    print(f'  >> Average quality: {value("average_quality_id", 0)} bps')
+    print(f'  >> Average throughput: {value("average_throughput", 0)} bps')
+    print(f'  >> Pauses per client: {value("pauses_number")} ({value("pauses_time")} s)')
+    print(f'  >> Startup delay: {value("startup_delay")} s')
+    print(f'  >> Switches per client: {value("switches")}')
+    print(f'  >> Jain\'s index: quality {value("jain_quality_id", 4)}, throughput {value("jain_throughput", 4)}')
+    print(f'> Shared link: {aggregate["link_transferred_bits"]} bits, busy {round(aggregate["link_busy_time"], 2)} s, '
+          f'at most {aggregate["link_max_flows"]} transfers at the same time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs several pyDash clients sharing a bottleneck link')
+    parser.add_argument('clients', type=int, help='number of clients')
+    parser.add_argument('--r2a', nargs='+', help='R2A classes assigned to the clients in turn '
+                                                 '(default: r2a_algorithm of dash_client.json)')
+    parser.add_argument('--capacity-scale', type=float, help='multiplies the traffic shaping profile '
+                                                             '(default: number of clients)')
+    parser.add_argument('--arrival-interval', type=float, default=0.0, help='time (s) between two client starts')
+    parser.add_argument('--results', default='multi_client.csv', help='QoE of every client (CSV)')
+    parser.add_argument('--output', default='multi_client.txt', help='output of the modules')
+    args = parser.parse_args()
+
+    with open('dash_client.json') as f:
+        parameters = json.load(f)
+
+    start = time.perf_counter()
+    with open(args.output, 'w') as output, contextlib.redirect_stdout(output):
+        multi_client = MultiDashClient(args.clients, parameters, args.r2a or [parameters['r2a_algorithm']],
+                                       args.capacity_scale, args.arrival_interval)
+        multi_client.run_application()
+
+    clients_statistics = [multi_client.get_client_statistics(i) for i in range(args.clients)]
+    with open(args.results, 'w', newline='') as results:
+        writer = csv.DictWriter(results, ['client', 'r2a_algorithm', 'start_time', *STATISTICS])
+        writer.writeheader()
+        for i, client_statistics in enumerate(clients_statistics):
+            writer.writerow({'client': i, 'r2a_algorithm': multi_client.r2a_algorithms[i],
+                             'start_time': multi_client.start_times[i],
+                             **{name: client_statistics.get(name) for name in STATISTICS}})
+
+    print_aggregate(multi_client.get_aggregate_statistics(clients_statistics))
+    print(f'> Elapsed time: {round(time.perf_counter() - start, 2)} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,30 +5,31 @@
 @description: PyDash Project
 
 OutVector class stores all simulation statistics to be plot later.
+
+The (time, item) pairs are rows of a SampleArray, so the history is shared
+with the whiteboard as a read-only view, without copies.
 """
 
-import datetime
+from base.sample_array import SampleArray
 
 
-class OutVector:
+class OutVector(SampleArray):
 
     def __init__(self):
-        self.items = []
+        SampleArray.__init__(self, 2)
 
     def add(self, t, item):
-        self.items.append([t, item])
-
-    def __len__(self):
-        return len(self.items)
+        self.append(t, item)
 
     def __str__(self):
-        return self.items.__str__()
+        return self.view().tolist().__str__()
 
-    def get_items(self):
-        return self.items
+    @property
+    def items(self):
+        return self.view()
 
-    #def __getitem__(self, key):
-    #    if len(self.items) == 0:
-    #        return []
-
-    #    return self.items[key]
+    def get_items(self):
+        """
+        Read-only NumPy array (n, 2) of the (time, item) rows.
+        """
+        return self.view()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+The buffer of the Player, one entry per segment instead of one per second
+of video, in compact arrays: the QI of every segment (uint8) and the time
+it was written in the buffer (float64). The durations are floats, kept by
+runs: consecutive segments of the same duration are a single row (segment
+duration, number of segments), so a dataset of fixed length segments keeps
+one row whatever the length of the session.
+
+The playback reads the buffer at increasing positions, the run of a
+position is found from the one of the previous read, in amortized O(1), and
+the segment inside the run by a division.
+"""
+
+import numpy as np
+
+from base.sample_array import SampleArray
+
+
+class PlaybackBuffer:
+
+    def __init__(self):
+        self.qi = SampleArray(1, dtype=np.uint8)
+        self.write_times = SampleArray(1)
+        # segment duration and number of segments of every run
+        self.runs = SampleArray(2, capacity=16)
+        # seconds of video stored
+        self.duration = 0
+
+        # run of the last position read, its start position and its first segment
+        self.run = 0
+        self.run_start = 0
+        self.run_first_segment = 0
+
+    def __len__(self):
+        return len(self.qi)
+
+    def add_segment(self, qi, duration, write_time):
+        if not 0 <= qi <= np.iinfo(np.uint8).max:
+            raise ValueError(f'Invalid segment qi parameter - {qi}')
+        if duration <= 0:
+            raise ValueError(f'Invalid segment duration parameter - {duration}')
+
+        if len(self.runs) and self.runs[-1, 0] == duration:
+            self.runs[-1, 1] += 1
+        else:
+            self.runs.append(duration, 1)
+        self.qi.append(qi)
+        self.write_times.append(write_time)
+        self.duration += duration
+
+    def get_duration(self):
+        """
+        Seconds of video stored, the played ones included.
+        """
+        return self.duration
+
+    def get_segment(self, position):
+        """
+        Returns (qi, write time) of the segment with the second position of
+        the video. The positions are read in increasing order.
+        """
+        if not 0 <= position < self.duration:
+            raise ValueError(f'Invalid buffer position parameter - {position}')
+
+        if position < self.run_start:
+            # a step back, the search restarts from the first run
+            self.run = 0
+            self.run_start = 0
+            self.run_first_segment = 0
+
+        duration, segments = self.runs[self.run]
+        while position >= self.run_start + duration * segments and self.run < len(self.runs) - 1:
+            self.run_start += duration * segments
+            self.run_first_segment += int(segments)
+            self.run += 1
+            duration, segments = self.runs[self.run]
+
+        # the last segment of the run, if the run end is rounded just above position
+        segment = self.run_first_segment + min(int((position - self.run_start) // duration), int(segments) - 1)
+        return int(self.qi[segment, 0]), float(self.write_times[segment, 0])
+
+    def get_runs(self):
+        """
+        Read-only view (n, 2) of the segment duration and number of segments
+        of the runs.
+        """
+        return self.runs.view()
+
+    def __get_run_starts(self):
+        runs = self.runs.view()
+        # the same sums of get_segment(), so both agree on the segment of a position
+        starts = np.zeros(len(runs))
+        for i in range(1, len(runs)):
+            starts[i] = starts[i - 1] + runs[i - 1, 0] * runs[i - 1, 1]
+        return runs, starts
+
+    def get_segments(self):
+        """
+        Array (n, 3) of the qi, end position and write time of every
+        segment. It is built on each call.
+        """
+        runs, starts = self.__get_run_starts()
+        segments = runs[:, 1].astype(np.intp)
+        run_of_segment = np.repeat(np.arange(len(runs)), segments)
+        index_in_run = np.arange(len(run_of_segment)) - np.repeat(np.cumsum(segments) - segments, segments)
+
+        rows = np.empty((len(run_of_segment), 3))
+        rows[:, 0] = self.qi.view()[:, 0]
+        rows[:, 1] = starts[run_of_segment] + (index_in_run + 1) * runs[run_of_segment, 0]
+        rows[:, 2] = self.write_times.view()[:, 0]
+        rows.flags.writeable = False
+        return rows
+
+    def get_qi_per_second(self):
+        """
+        Array of the QI of every second of video stored, the one of the
+        segment where the second starts. It is built on each call.
+        """
+        runs, starts = self.__get_run_starts()
+        seconds = np.arange(int(np.ceil(self.duration)))
+        # the last run, if its end is rounded just below the last second
+        run = np.minimum(np.searchsorted(starts, seconds, side='right') - 1, len(runs) - 1)
+        first_segment = np.cumsum(runs[:, 1]).astype(np.intp) - runs[:, 1].astype(np.intp)
+        index_in_run = np.minimum((seconds - starts[run]) // runs[run, 0], runs[run, 1] - 1).astype(np.intp)
+
+        qi_per_second = self.qi.view()[first_segment[run] + index_in_run, 0].astype(np.int32)
+        qi_per_second.flags.writeable = False
+        return qi_per_second
@@ -12,17 +12,15 @@ Also "watches" the movie and compute the statistics.
 import glob
 import os
 import threading
-import time
-from matplotlib import pyplot as plt
 import statistics
 
-from base.configuration_parser import ConfigurationParser
+from base.feature_store import FeatureStore
 from base.message import *
+from base.sample_array import SampleArray
 from base.simple_module import SimpleModule
-from base.timer import Timer
 from player.out_vector import OutVector
+from player.playback_buffer import PlaybackBuffer
 from player.parser import *
-from base.whiteboard import Whiteboard
 
 '''
 quality_id - Taxa em que o video foi codificado (46980bps, ..., 4726737bps) 
@@ -33,13 +31,16 @@ Player is a Singleton class implementation
 
 '''
 
+# pyplot is shared by the sessions running in the same process
+plot_lock = threading.Lock()
+
 
 class Player(SimpleModule):
 
-    def __init__(self, id):
-        SimpleModule.__init__(self, id)
+    def __init__(self, id, context=None):
+        SimpleModule.__init__(self, id, context)
 
-        config_parser = ConfigurationParser.get_instance()
+        config_parser = self.context.config_parser
 
         self.buffering_until = int(config_parser.get_parameter('buffering_until'))
         self.max_buffer_size = int(config_parser.get_parameter('max_buffer_size'))
@@ -56,10 +57,10 @@ class Player(SimpleModule):
         # Does the player already started to download a segment?
         self.already_downloading = False
 
-        # buffer itself
-        self.buffer = []
+        # buffer itself, the qi and write time of every segment stored
+        self.buffer = PlaybackBuffer()
 
-        # the buffer played position
+        # the buffer played position (s)
         self.buffer_played = 0
 
         # history of what was played in buffer
@@ -71,17 +72,20 @@ class Player(SimpleModule):
         self.parsed_mpd = ''
         self.qi = []
 
-        self.timer = Timer.get_instance()
+        self.timer = self.context.timer
 
         # threading playback
         self.playback_thread = threading.Thread(target=self.handle_video_playback)
         self.player_thread_events = threading.Event()
         self.lock = threading.Lock()
         self.kill_playback_thread = False
+        # virtual time mode, the next request waits for the playback to release buffer space
+        self.waiting_buffer_space = False
 
         self.request_time = 0
 
-        self.playback_segment_size_time_at_buffer = []
+        # time each second of video spent in the buffer, once played
+        self.playback_segment_size_time_at_buffer = SampleArray(1)
         self.playback_qi = OutVector()
         self.playback_quality_qi = OutVector()
         self.playback_pauses = OutVector()
@@ -89,26 +93,32 @@ class Player(SimpleModule):
         self.playback_buffer_size = OutVector()
         self.throughput = OutVector()
 
-        self.whiteboard = Whiteboard.get_instance()
-        self.whiteboard.add_playback_history(self.playback.get_items())
-        self.whiteboard.add_playback_qi(self.playback_qi.get_items())
-        self.whiteboard.add_playback_pauses(self.playback_pauses.get_items())
-        self.whiteboard.add_playback_buffer_size(self.playback_buffer_size.get_items())
+        self.whiteboard = self.context.whiteboard
+        # the histories are shared with the R2A, which reads them as views
+        self.whiteboard.add_playback_history(self.playback)
+        self.whiteboard.add_playback_qi(self.playback_qi)
+        self.whiteboard.add_playback_pauses(self.playback_pauses)
+        self.whiteboard.add_playback_buffer_size(self.playback_buffer_size)
         self.whiteboard.add_buffer(self.buffer)
         self.whiteboard.add_playback_segment_size_time_at_buffer(self.playback_segment_size_time_at_buffer)
         self.whiteboard.add_max_buffer_size(self.max_buffer_size)
 
+        # throughput, buffer, stalls and switches features, updated as the events happen
+        self.features = FeatureStore(int(config_parser.get_parameter('feature_throughput_window')),
+                                     float(config_parser.get_parameter('feature_throughput_ewma_weight')))
+        self.whiteboard.add_features(self.features)
+
     def get_qi(self, quality_qi):
         return self.qi.index(quality_qi)
 
     def get_amount_of_video_to_play_without_lock(self):
-        video_data = len(self.buffer) - self.buffer_played
+        video_data = self.buffer.get_duration() - self.buffer_played
         self.whiteboard.add_amount_video_to_play(video_data)
         return video_data
 
     def get_amount_of_video_to_play(self):
         self.lock.acquire()
-        video_data = len(self.buffer) - self.buffer_played
+        video_data = self.buffer.get_duration() - self.buffer_played
         self.lock.release()
         self.whiteboard.add_amount_video_to_play(video_data)
         return video_data
@@ -125,66 +135,88 @@ class Player(SimpleModule):
 
     def get_buffer_size(self):
         self.lock.acquire()
-        bs = len(self.buffer)
+        bs = self.buffer.get_duration()
         self.lock.release()
         return bs
 
     # called function every time a segment was played
     def handle_video_playback(self):
-        while True:
-            self.lock.acquire()
-            current_time = self.timer.get_current_time()
-            buffer_size = self.get_amount_of_video_to_play_without_lock()
-            # print(f'{current_time} player acordou')
-
-            # there is something to play
-            if buffer_size > 0:
-                # player thread is sleeping.
-                if buffer_size >= self.max_buffer_size and not self.already_downloading:
-                    print(f'{current_time} Acordar Player Thread!')
-                    self.player_thread_events.set()
-                    self.player_thread_events.clear()
-
-                for i in range(self.playback_step):
-                    qi = self.buffer[self.buffer_played]
-                    self.playback_qi.add(current_time, qi)
-                    self.playback_quality_qi.add(current_time, self.qi[qi])
-                    self.playback.add(current_time, 1)
-
-                    # compute the difference time from writing to read the segment in the buffer
-                    # self.playback_segment_size_time_at_buffer[self.buffer_played] -= current_time
-                    self.playback_segment_size_time_at_buffer[self.buffer_played][1] = current_time
-
-                    self.buffer_played += 1
-
-                buffer_size = self.get_amount_of_video_to_play_without_lock()
-                self.playback_buffer_size.add(current_time, buffer_size)
-                print(f'Execution Time {current_time} > buffer size: {buffer_size}')
-
-                if self.pause_started_at is not None:
-                    # pause_time = (time.time_ns() - self.pause_started_at) * 1e-9
-                    pause_time = current_time - self.pause_started_at
-                    self.playback_pauses.add(current_time, pause_time)
-                    self.pause_started_at = None
-            else:
-                # self.pause_started_at = time.time_ns()
-                self.playback.add(current_time, 0)
+        while self.handle_video_playback_step():
+            # playback steps
+            self.timer.sleep(self.playback_step)
+
+    # virtual time mode counterpart of handle_video_playback(), driven by the timer callbacks
+    def handle_virtual_video_playback(self):
+        playing = self.handle_video_playback_step()
+
+        # the request delayed by a full buffer is sent as soon as there is space again
+        if self.waiting_buffer_space and self.get_amount_of_video_to_play() < self.max_buffer_size:
+            self.waiting_buffer_space = False
+            self.request_next_segment()
+
+        if playing:
+            self.timer.call_later(self.playback_step, self.handle_virtual_video_playback)
+
+    # plays a playback_step, returns False when the playback is over
+    def handle_video_playback_step(self):
+        self.lock.acquire()
+        current_time = self.timer.get_current_time()
+        buffer_size = self.get_amount_of_video_to_play_without_lock()
+        # print(f'{current_time} player acordou')
+
+        # there is something to play
+        if buffer_size > 0:
+            # player thread is sleeping.
+            if buffer_size >= self.max_buffer_size and not self.already_downloading:
+                print(f'{current_time} Acordar Player Thread!')
+                self.player_thread_events.set()
+                self.player_thread_events.clear()
+
+            for i in range(self.playback_step):
+                # the last segment may end in the middle of the step
+                if self.buffer_played >= self.buffer.get_duration():
+                    break
+
+                qi, write_time = self.buffer.get_segment(self.buffer_played)
+                self.playback_qi.add(current_time, qi)
+                self.features.add_played_qi(qi)
+                self.playback_quality_qi.add(current_time, self.qi[qi])
+                self.playback.add(current_time, 1)
+
+                # compute the difference time from writing to read the segment in the buffer
+                self.playback_segment_size_time_at_buffer.append(round(current_time - write_time, 6))
 
-                if self.pause_started_at is None:
-                    self.pauses_number += 1
-                    self.pause_started_at = current_time
+                self.buffer_played += 1
 
-            # update buffer_size
             buffer_size = self.get_amount_of_video_to_play_without_lock()
-            self.lock.release()
+            self.playback_buffer_size.add(current_time, buffer_size)
+            self.features.add_buffer_level(current_time, buffer_size)
+            print(f'Execution Time {current_time} > buffer size: {buffer_size}')
+
+            if self.pause_started_at is not None:
+                # pause_time = (time.time_ns() - self.pause_started_at) * 1e-9
+                pause_time = current_time - self.pause_started_at
+                self.playback_pauses.add(current_time, pause_time)
+                self.pause_started_at = None
+                self.features.add_stall_end(current_time)
+        else:
+            # self.pause_started_at = time.time_ns()
+            self.playback.add(current_time, 0)
 
-            if (not threading.main_thread().is_alive() or self.kill_playback_thread) and buffer_size <= 0:
-                print(f'Execution Time {current_time}  thread {threading.get_ident()} will be killed.')
-                break
+            if self.pause_started_at is None:
+                self.pauses_number += 1
+                self.features.add_stall_start(current_time)
+                self.pause_started_at = current_time
 
-            # playback steps
-            # print(f'{current_time} player vai dormir')
-            time.sleep(self.playback_step)
+        # update buffer_size
+        buffer_size = self.get_amount_of_video_to_play_without_lock()
+        self.lock.release()
+
+        if (not threading.main_thread().is_alive() or self.kill_playback_thread) and buffer_size <= 0:
+            print(f'Execution Time {current_time}  thread {threading.get_ident()} will be killed.')
+            return False
+
+        return True
 
     def buffering_video_segment(self, msg):
         # buffer already stored the segment id
@@ -195,33 +227,52 @@ class Player(SimpleModule):
         # adding the segment in the buffer
         self.store_in_buffer(self.get_qi(msg.get_quality_id()), msg.get_segment_size())
 
-        # statistical purpose
+        # statistical purpose, the playback thread also appends buffer sizes (under the lock)
+        self.lock.acquire()
         current_time = self.timer.get_current_time()
-        buffer_size = self.get_amount_of_video_to_play()
+        buffer_size = self.get_amount_of_video_to_play_without_lock()
         self.playback_buffer_size.add(current_time, buffer_size)
+        self.features.add_buffer_level(current_time, buffer_size)
+        self.lock.release()
         print(f'Execution Time {current_time} > buffer size: {buffer_size}')
 
         if self.buffer_initialization and self.get_amount_of_video_to_play() >= self.buffering_until:
             self.buffer_initialization = False
             print(f'Execution Time {self.timer.get_current_time()} buffering process is concluded')
-            self.playback_thread.start()
+            if self.timer.is_virtual():
+                self.timer.call_later(0, self.handle_virtual_video_playback)
+            else:
+                self.playback_thread.start()
+
+    def wait_for_buffer_space(self):
+        """
+        Returns True when the next segment can be requested right away. In
+        the virtual time mode the clock is not moved here (it is shared by
+        the clients of a multi-client session), the request is left to the
+        playback step that releases buffer space.
+        """
+        if not self.timer.is_virtual():
+            self.player_thread_events.wait()
+            return True
+
+        # before the playback starts nothing would release buffer space
+        if self.buffer_initialization:
+            return True
+
+        self.waiting_buffer_space = True
+        return False
 
     def store_in_buffer(self, qi, segment_size):
         self.lock.acquire()
-        current_time = self.timer.get_current_time()
-
-        for i in range(segment_size):
-            self.buffer.append(qi)
-
-            # logging the time the segment size was written in the buffer
-            self.playback_segment_size_time_at_buffer.append([current_time, -1])
+        # logging the time the segment was written in the buffer
+        self.buffer.add_segment(qi, segment_size, self.timer.get_current_time())
         self.lock.release()
 
     def request_next_segment(self):
         if self.already_downloading:
             raise ValueError('Something doesn\'t look right, a segment is already being downloaded!')
 
-        self.request_time = time.perf_counter()
+        self.request_time = self.timer.perf_counter()
         # self.request_time = self.timer.get_current_time()
         segment_request = SSMessage(MessageKind.SEGMENT_REQUEST)
 
@@ -246,34 +297,59 @@ class Player(SimpleModule):
         xml_request = Message(MessageKind.XML_REQUEST, self.url_mpd)
         self.send_down(xml_request)
 
-    def finalization(self):
-
-        print(f'Pauses number: {self.pauses_number}')
+    def get_statistics(self):
+        """
+        QoE summary of the session, the values not available are None.
+        """
+        pauses = self.playback_pauses.get_items()[:, 1].tolist()
+        playback_qi = self.playback_qi.get_items()[:, 1].tolist()
+        diff = [abs(playback_qi[i + 1] - playback_qi[i]) for i in range(len(playback_qi) - 1)]
+
+        def summary(values):
+            if len(values) > 1:
+                return statistics.mean(values), statistics.stdev(values), statistics.variance(values)
+            return None, None, None
+
+        average_pause, pause_stdev, pause_variance = summary(pauses)
+        average_qi, qi_stdev, qi_variance = summary(playback_qi)
+        average_qi_distance, qi_distance_stdev, qi_distance_variance = summary(diff)
+
+        return {
+            'pauses_number': self.pauses_number,
+            'average_pause': average_pause,
+            'pause_stdev': pause_stdev,
+            'pause_variance': pause_variance,
+            'average_qi': average_qi,
+            'qi_stdev': qi_stdev,
+            'qi_variance': qi_variance,
+            'average_qi_distance': average_qi_distance,
+            'qi_distance_stdev': qi_distance_stdev,
+            'qi_distance_variance': qi_distance_variance,
+        }
 
-        if self.pauses_number > 1:
-            pauses = [i[1] for i in self.playback_pauses.get_items()]
-            print(f'  >> Average Time Pauses: {round(statistics.mean(pauses), 2)}')
-            print(f'  >> Standard deviation: {round(statistics.stdev(pauses), 2)}')
-            print(f'  >> Variance: {round(statistics.variance(pauses), 2)}')
+    def finalization(self):
+        session_statistics = self.get_statistics()
 
-        playback_qi = [i[1] for i in self.playback_qi.get_items()]
+        print(f'Pauses number: {session_statistics["pauses_number"]}')
 
-        if len(playback_qi) > 1:
-            print(f'Average QI: {round(statistics.mean(playback_qi), 2)}')
-            print(f'  >> Standard deviation: {round(statistics.stdev(playback_qi), 2)}')
-            print(f'  >> Variance: {round(statistics.variance(playback_qi), 2)}')
+        if session_statistics['pauses_number'] > 1 and session_statistics['average_pause'] is not None:
+            print(f'  >> Average Time Pauses: {round(session_statistics["average_pause"], 2)}')
+            print(f'  >> Standard deviation: {round(session_statistics["pause_stdev"], 2)}')
+            print(f'  >> Variance: {round(session_statistics["pause_variance"], 2)}')
 
-        diff = []
-        for i in range(len(playback_qi) - 1):
-            diff.append(abs(playback_qi[i + 1] - playback_qi[i]))
+        if session_statistics['average_qi'] is not None:
+            print(f'Average QI: {round(session_statistics["average_qi"], 2)}')
+            print(f'  >> Standard deviation: {round(session_statistics["qi_stdev"], 2)}')
+            print(f'  >> Variance: {round(session_statistics["qi_variance"], 2)}')
 
-        if len(diff) > 1:
-            print(f'Average QI distance: {round(statistics.mean(diff), 2)}')
-            print(f'  >> Standard deviation: {round(statistics.stdev(diff), 2)}')
-            print(f'  >> Variance: {round(statistics.variance(diff), 2)}')
+        if session_statistics['average_qi_distance'] is not None:
+            print(f'Average QI distance: {round(session_statistics["average_qi_distance"], 2)}')
+            print(f'  >> Standard deviation: {round(session_statistics["qi_distance_stdev"], 2)}')
+            print(f'  >> Variance: {round(session_statistics["qi_distance_variance"], 2)}')
 
-        [os.remove(f) for f in glob.glob('./results/*.png')]
-        self.logging_all_statistics()
+        with plot_lock:
+            [os.remove(f) for f in glob.glob('./results/*.png')]
+            self.logging_all_statistics()
 
     def handle_xml_response(self, msg):
         self.parsed_mpd = parse_mpd(msg.get_payload())
@@ -289,8 +365,9 @@ class Player(SimpleModule):
         print(f'Execution Time {current_time} > received: {msg}')
 
         if msg.found():
-            measured_throughput = msg.get_bit_length() / (time.perf_counter() - self.request_time)
+            measured_throughput = msg.get_bit_length() / (self.timer.perf_counter() - self.request_time)
             self.throughput.add(current_time, measured_throughput)
+            self.features.add_throughput(current_time, measured_throughput)
 
             print(f'Execution Time {self.timer.get_current_time()} > measured throughput: {measured_throughput}')
 
@@ -301,7 +378,8 @@ class Player(SimpleModule):
             if self.get_amount_of_video_to_play() >= self.max_buffer_size:
                 print(
                     f'Execution Time {current_time} Maximum buffer size is achieved... the principal process will sleep now.')
-                self.player_thread_events.wait()
+                if not self.wait_for_buffer_space():
+                    return
 
             self.request_next_segment()
 
@@ -316,7 +394,9 @@ class Player(SimpleModule):
         else:
             print(f'Execution Time {current_time} All video\'s segments was downloaded')
             self.kill_playback_thread = True
-            if self.playback_thread.is_alive():
+            # in the virtual time mode the remaining buffer is played by the timer callbacks,
+            # run by the DashClient once there are no more events
+            if not self.timer.is_virtual() and self.playback_thread.is_alive():
                 self.playback_thread.join()
 
     def __multiplication_factor(self, values: list):
@@ -344,26 +424,24 @@ class Player(SimpleModule):
 
 
         fact = self.__multiplication_factor(self.throughput.items)
-        self.throughput.items = [(x, i / fact[0]) for x, i in self.throughput.items]
-        self.logVlines(self.throughput, 'throughput', 'Throughput Variation', fact[1])
+        self.logVlines(self.throughput.items / (1, fact[0]), 'throughput', 'Throughput Variation', fact[1])
 
-        self.log(self.playback_quality_qi, 'playback_quality_qi', 'Quality QI', 'Mbps')
-        self.log(self.playback_pauses, 'playback_pauses', 'Pauses Size (seconds)', 'Pauses Size')
-        self.log(self.playback, 'playback', 'Playback History', 'on/off')
-        self.log(self.playback_qi, 'playback_qi', 'Quality Index', 'QI')
-        self.log(self.playback_buffer_size, 'playback_buffer_size', 'Buffer Size', 'seconds')
+        self.log(self.playback_quality_qi.items, 'playback_quality_qi', 'Quality QI', 'Mbps')
+        self.log(self.playback_pauses.items, 'playback_pauses', 'Pauses Size (seconds)', 'Pauses Size')
+        self.log(self.playback.items, 'playback', 'Playback History', 'on/off')
+        self.log(self.playback_qi.items, 'playback_qi', 'Quality Index', 'QI')
+        self.log(self.playback_buffer_size.items, 'playback_buffer_size', 'Buffer Size', 'seconds')
 
-    def log(self, log, file_name, title, y_axis, x_axis='execution time (s)'):
-        items = log.items
+    # items: (time, value) rows
+    def log(self, items, file_name, title, y_axis, x_axis='execution time (s)'):
+        # matplotlib takes most of the start time, it is only loaded by the plots at the end
+        from matplotlib import pyplot as plt
 
         if len(items) == 0:
             return
 
-        x = []
-        y = []
-        for i in range(len(items)):
-            x.append(items[i][0])
-            y.append(items[i][1])
+        x = items[:, 0]
+        y = items[:, 1]
 
         plt.plot(x, y, label=file_name)
         plt.xlabel(x_axis)
@@ -376,17 +454,14 @@ class Player(SimpleModule):
         plt.cla()
         plt.close()
 
-    def logVlines(self, log, file_name, title, y_axis, x_axis='execution time (s)'):
-        items = log.items
+    def logVlines(self, items, file_name, title, y_axis, x_axis='execution time (s)'):
+        from matplotlib import pyplot as plt
 
         if len(items) == 0:
             return
 
-        x = []
-        y = []
-        for i in range(len(items)):
-            x.append(items[i][0])
-            y.append(items[i][1])
+        x = items[:, 0]
+        y = items[:, 1]
 
         _, ax = plt.subplots()
         ax.vlines(x, [0], y, color='brown')
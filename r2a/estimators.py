@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Throughput estimators for the R2A algorithms, all of them with the same
+interface: add(time, value) for every measurement and get_estimate(time)
+at the decision, None while there is nothing to estimate.
+
+    WindowMean          - mean of the samples of the last window seconds
+                          (or of the last size samples)
+    WindowHarmonicMean  - harmonic mean of the same samples
+    Ewma                - exponentially weighted moving average
+    StreamingPercentile - percentile of all the samples, P-square sketch
+    KalmanEstimator     - scalar Kalman filter of a random walk
+
+Every update is O(1) (amortized for the windows): the windowed samples are
+kept in a deque along with their sum, so the samples that leave the window
+are subtracted instead of the mean being recomputed.
+
+create_estimator() returns the estimator of the r2a_throughput_estimator
+parameter.
+"""
+
+import math
+from collections import deque
+
+
+class WindowMean:
+    """
+    The samples added in the last window seconds, a sample of time t is
+    discarded once time - t > window. With a size, only the last size
+    samples are kept as well. With an infinite window and no size, the mean
+    of every sample, without storing them.
+    """
+
+    def __init__(self, window=math.inf, size=None):
+        self.window = window
+        self.size = size
+        # (time, value) in the window, only if it is bounded
+        self.samples = deque()
+        self.count = 0
+        self.sum = 0.0
+        # the inverses of the positive samples, a zero sample makes the harmonic mean zero
+        self.inverse_sum = 0.0
+        self.zeros = 0
+        self.last = None
+        # samples discarded since the sums were recomputed
+        self.discarded = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, time, value):
+        if self.window != math.inf or self.size is not None:
+            self.samples.append((time, value))
+        self.count += 1
+        self.sum += value
+        self.__add_inverse(value, 1)
+        self.last = value
+
+        if self.size is not None and self.count > self.size:
+            self.__discard_first()
+            self.__resum()
+
+    def __add_inverse(self, value, sign):
+        if value > 0:
+            self.inverse_sum += sign / value
+        else:
+            self.zeros += sign
+
+    def discard(self, time):
+        """
+        Discards the samples older than window seconds at time.
+        """
+        while self.samples and time - self.samples[0][0] > self.window:
+            self.__discard_first()
+        self.__resum()
+
+    def __discard_first(self):
+        _, value = self.samples.popleft()
+        self.count -= 1
+        self.sum -= value
+        self.__add_inverse(value, -1)
+        self.discarded += 1
+
+    def __resum(self):
+        # the subtractions are not exact, the sums are recomputed once per window length
+        if self.discarded > self.count:
+            self.sum = math.fsum(value for _, value in self.samples)
+            self.inverse_sum = math.fsum(1 / value for _, value in self.samples if value > 0)
+            self.discarded = 0
+
+    def get_last(self):
+        return self.last
+
+    def get_mean(self, time=None):
+        if time is not None:
+            self.discard(time)
+        return self.sum / self.count if self.count else None
+
+    def get_harmonic_mean(self, time=None):
+        if time is not None:
+            self.discard(time)
+        if not self.count:
+            return None
+        return 0.0 if self.zeros else self.count / self.inverse_sum
+
+    def get_estimate(self, time=None):
+        return self.get_mean(time)
+
+
+class WindowHarmonicMean(WindowMean):
+    """
+    Harmonic mean of the window, less sensitive to the outliers above the
+    mean than the arithmetic mean.
+    """
+
+    def get_estimate(self, time=None):
+        return self.get_harmonic_mean(time)
+
+
+class Ewma:
+
+    def __init__(self, weight=0.8):
+        """
+        weight: weight of the newest sample
+        """
+        self.weight = weight
+        self.value = None
+        self.last = None
+
+    def add(self, time, value):
+        self.last = value
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = (1 - self.weight) * self.value + self.weight * value
+
+    def get_last(self):
+        return self.last
+
+    def get_estimate(self, time=None):
+        return self.value
+
+
+class StreamingPercentile:
+    """
+    The P-square algorithm (Jain and Chlamtac, 1985): five markers whose
+    heights approximate the minimum, the p/2, p and (1 + p)/2 quantiles and
+    the maximum are adjusted by a parabolic interpolation as the samples
+    arrive. It takes O(1) memory and time per sample.
+    """
+
+    def __init__(self, percentile=20):
+        self.p = percentile / 100
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4]
+        self.increments = [0, self.p / 2, self.p, (1 + self.p) / 2, 1]
+        self.last = None
+
+    def add(self, time, value):
+        self.last = value
+
+        # the first five samples are the initial markers
+        if len(self.heights) < 5:
+            self.heights.append(value)
+            self.heights.sort()
+            return
+
+        heights, positions = self.heights, self.positions
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # the three inner markers are moved towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.__parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = height
+                positions[i] += d
+
+    def __parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                                                   (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def get_last(self):
+        return self.last
+
+    def get_estimate(self, time=None):
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            # exact percentile of the few samples
+            return self.heights[min(int(self.p * len(self.heights)), len(self.heights) - 1)]
+        return self.heights[2]
+
+
+class KalmanEstimator:
+    """
+    Kalman filter of a throughput that follows a random walk, observed with
+    a measurement noise. The noises are relative standard deviations (a
+    fraction of the estimated throughput), so the filter does not depend on
+    the unit of the samples.
+    """
+
+    def __init__(self, process_noise=0.1, measurement_noise=0.3):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.value = None
+        self.variance = 0.0
+        self.last = None
+
+    def add(self, time, value):
+        self.last = value
+        if self.value is None:
+            self.value = value
+            self.variance = (self.measurement_noise * value) ** 2
+            return
+
+        # prediction, the throughput may have moved since the last sample
+        self.variance += (self.process_noise * self.value) ** 2
+        # correction by the measurement
+        measurement_variance = (self.measurement_noise * self.value) ** 2
+        if self.variance + measurement_variance == 0:
+            # a zero estimate, the measurement is taken as it is
+            self.value = value
+            self.variance = (self.measurement_noise * value) ** 2
+            return
+        gain = self.variance / (self.variance + measurement_variance)
+        self.value += gain * (value - self.value)
+        self.variance *= 1 - gain
+
+    def get_last(self):
+        return self.last
+
+    def get_variance(self):
+        return self.variance
+
+    def get_estimate(self, time=None):
+        return self.value
+
+
+def create_estimator(name, window=math.inf):
+    """
+    Estimator of the r2a_throughput_estimator parameter: window_mean,
+    window_harmonic_mean (both over window seconds), ewma, percentile (the
+    20th) or kalman.
+    """
+    if name == 'window_mean':
+        return WindowMean(window)
+    if name == 'window_harmonic_mean':
+        return WindowHarmonicMean(window)
+    if name == 'ewma':
+        return Ewma()
+    if name == 'percentile':
+        return StreamingPercentile()
+    if name == 'kalman':
+        return KalmanEstimator()
+    raise ValueError(f'Invalid r2a_throughput_estimator parameter - {name}')
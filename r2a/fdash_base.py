@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Grupo 9
+
+@author: Felipe Oliveira Magno Neves    - 16/0016296
+@author: Luís Vinicius Capelletto       - 16/0134544
+@author: Matheus Augusto Silva Pinho    - 18/0024906
+
+@description: Base comum dos algoritmos FDASH
+
+Cada variante do FDASH é uma configuração do controlador fuzzy descrito em
+fdash_controllers.json (com o nome da classe) mais as entradas que ela
+fornece ao controlador.
+"""
+from abc import abstractmethod
+
+import numpy as np
+from r2a.estimators import Ewma, create_estimator
+from r2a.fuzzy_controller import FuzzyController
+from r2a.fuzzy_engine import plot_control_surface
+from r2a.ir2a import IR2A
+from player.parser import *
+from statistics import mean
+
+
+class FDASHBase(IR2A):
+    def __init__(self, id, context=None):
+        IR2A.__init__(self, id, context)
+        self.qi = []
+        self.request_time = 0
+        self.current_qi_index = 0
+        self.smooth_troughput = None
+        self.pbs = []
+        self.pbt = []
+
+        # Nível do buffer e demais features mantidas pelo Player, lidas em O(1)
+        self.features = self.whiteboard.get_features()
+
+        # Tamanho máximo do buffer, parâmetro do controlador conhecido apenas na execução
+        self.buff_max = self.whiteboard.get_max_buffer_size()
+        self.controller = FuzzyController.load(self.__class__.__name__, {'buff_max': self.buff_max},
+                                               config_parser=self.context.config_parser)
+
+        # Tempo de estimativa do throughput da conexão
+        self.d = self.controller.get_parameter('d')
+        # Throughputs medidos: média dos ultimos d segundos por padrão (r2a_throughput_estimator)
+        self.throughputs = create_estimator(str(self.context.get_parameter('r2a_throughput_estimator')), self.d)
+        # Suavização do throughput estimado
+        self.smooth_estimator = Ewma(0.8)
+        # Tamanho de buffer perigoso
+        self.buff_size_danger = self.controller.get_parameter('buff_size_danger')
+        # Configura controlador FLC
+        self.FDASH = self.controller.create_simulation()
+
+    @abstractmethod
+    def get_controller_inputs(self):
+        """
+        Entradas do controlador para a requisição atual, {nome: valor}.
+        """
+        pass
+
+    def compute_factor(self, **inputs):
+        for name, value in inputs.items():
+            self.FDASH.input[name] = value
+        self.FDASH.compute()
+        # Fator de saída calculado pelo simulador FLC
+        return self.FDASH.output[self.controller.get_output_name()]
+
+    def handle_xml_request(self, msg):
+        self.send_down(msg)
+
+    def handle_xml_response(self, msg):
+        parsed_mpd = parse_mpd(msg.get_payload())
+        self.qi = parsed_mpd.get_qi()
+        self.send_up(msg)
+
+    def handle_segment_size_request(self, msg):
+        self.pbt = self.whiteboard.get_playback_segment_size_time_at_buffer()
+
+        if(len(self.pbt) > 1):
+            avg_throughput = self.throughputs.get_estimate(self.timer.perf_counter())
+
+            # Smooth trhoughput
+            self.smooth_troughput = self.smooth_throughput(avg_throughput)
+
+            factor = self.compute_factor(**self.get_controller_inputs())
+            # Media dos k ultimos throughtputs multiplicada por fator
+            desired_quality_id = self.smooth_troughput * factor
+            desired_quality_id = self.minimize_switch_rate(desired_quality_id)
+
+            self.print_request_info(msg, avg_throughput, factor, desired_quality_id)
+
+            # Descobrir indice da maior qualidade mais proximo da qualidade desejada
+            self.current_qi_index = self.get_selected_qi(desired_quality_id, True)
+
+        # Nos primeiros segmentos, escolher a menor qualidade possível
+        msg.add_quality_id(self.qi[self.current_qi_index])
+        self.request_time = self.timer.perf_counter()
+        self.send_down(msg)
+
+    def handle_segment_download_progress(self, msg, received, total, elapsed):
+        quality_id = self.get_abandonment_quality_id(msg, received, total, elapsed, self.qi)
+        if quality_id is not None:
+            # a próxima decisão parte da qualidade realmente baixada
+            self.current_qi_index = self.qi.index(quality_id)
+        return quality_id
+
+    def handle_segment_size_response(self, msg):
+        self.add_throughput(msg)
+        self.send_up(msg)
+
+    def add_throughput(self, msg):
+        # throughput da requisição respondida por msg (mpd ou segmento), o segmento após o último não existe
+        if msg.get_bit_length() <= 0:
+            return
+        t = self.timer.perf_counter() - self.request_time
+        self.throughputs.add(self.timer.perf_counter(), msg.get_bit_length() / t)
+
+    def smooth_throughput(self, avg_throughput):
+        self.smooth_estimator.add(self.timer.perf_counter(), avg_throughput)
+        return self.smooth_estimator.get_estimate()
+
+    def minimize_switch_rate(self, desired_quality_id):
+        selected_qi = self.get_selected_qi(desired_quality_id)
+        prev_quality_id = self.qi[self.current_qi_index]
+        current_buff_size = self.features.get_buffer_level()
+        prev_buff_size = current_buff_size - self.features.get_buffer_level_diff()
+        predicted_buff = current_buff_size + (self.smooth_troughput / selected_qi - 1)
+
+        if selected_qi > prev_quality_id and prev_buff_size <= self.buff_size_danger:
+            return prev_quality_id
+        if selected_qi < prev_quality_id and predicted_buff >= 0.5 * self.buff_max:
+            return prev_quality_id
+
+        return desired_quality_id
+
+    def get_selected_qi(self, desired_quality_id, get_index=False):
+        selected_qi_index = np.searchsorted(self.qi, desired_quality_id, side='right') - 1
+        if get_index:
+            return selected_qi_index if selected_qi_index > 0 else 0
+
+        return self.qi[selected_qi_index] if selected_qi_index > 0 else self.qi[0]
+
+    def compute_batch(self, **inputs):
+        """
+        Controller output for NumPy arrays of inputs in a single vectorized call.
+        """
+        return self.controller.get_engine().evaluate(inputs)
+
+    def plot_control_surface(self, x_name, y_name=None, fixed=None, file_name=None):
+        return plot_control_surface(self.controller.get_engine(), x_name, y_name, fixed, file_name=file_name)
+
+    def print_request_info(self, msg, avg_throughput, factor, desired_quality_id):
+        print("-----------------------------------------")
+        buffering_time = self.pbt[-1]
+        buffering_time_diff = buffering_time - self.pbt[-2]
+
+        print("AVG Throughput = ", avg_throughput)
+        print("buffering_time = ", buffering_time)
+        print("buffering_time_diff = ", buffering_time_diff)
+        print(">>>>> Fator de acréscimo/decréscimo =", factor)
+
+        current_quality_id = self.qi[self.current_qi_index]
+        print(f"CURRENT QUALITY ID: {current_quality_id}bps")
+        print(f"DESIRED QUALITY ID: {int(desired_quality_id)}bps")
+
+        playback_pauses = self.whiteboard.get_playback_pauses()
+        print("PAUSES:", len(playback_pauses))
+        print("SEGMENT ID:", msg.get_segment_id())
+        print("-----------------------------------------")
+
+    def print_throughputs(self):
+        print("-----------------------------------------")
+        print(f"LAST THROUGHPUT: {self.throughputs.get_last()}")
+        estimate = self.throughputs.get_estimate(self.timer.perf_counter())
+        if estimate is not None:
+            print(f"ESTIMATED THROUGHPUT: {int(estimate)} bps")
+        print("-----------------------------------------")
+
+    def print_buffer_times(self):
+        pbt = self.whiteboard.get_playback_segment_size_time_at_buffer()
+        print("-----------------------------------------")
+        print(f"BUFFER TIMES: {pbt} >>>> LEN: {len(pbt)}")
+        if len(pbt) >= 1:
+            print(f"AVG BUFFER TIME: {int(mean(pbt))}s")
+        print("-----------------------------------------")
+
+    def print_buffer_sizes(self):
+        pbs = self.whiteboard.get_playback_buffer_size()
+        print("-----------------------------------------")
+        print(f"BUFFER SIZES: {pbs} >>>> LEN: {len(pbs)}")
+        if len(pbs) >= 1:
+            print(f"AVG BUFFER SIZE: {int(mean(b[1] for b in pbs))}")
+        print("-----------------------------------------")
+
+    def initialize(self):
+        pass
+
+    def finalization(self):
+        pass
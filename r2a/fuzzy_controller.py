@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Declarative fuzzy controllers for the FDASH R2A algorithms.
+
+The controllers are described as data in fdash_controllers.json, one entry
+per R2A class:
+    parameters - named constants of the controller
+    inputs     - name, universe [start, stop, step] and membership functions
+                 {label: [skfuzzy function, points]} of every input
+    output     - the same description for the consequent
+    rules      - the antecedent names and the rule table, one row per rule
+                 with the antecedent labels followed by the consequent label
+Numbers may be written as arithmetic expressions of the parameters, such as
+"2*T/3" or "inf". Parameters only known at run time (buff_max) are given by
+the R2A algorithm.
+
+The compiled engine is stored in the cache directory, named by a hash of
+the definition and the parameters. The skfuzzy ControlSystem is only built
+by the first session of a definition, to validate the engine, or when the
+fuzzy_engine parameter is skfuzzy.
+"""
+
+import ast
+import json
+import math
+import operator
+import os
+from functools import reduce
+
+import numpy as np
+
+from base.cache import cache_file
+from base.configuration_parser import ConfigurationParser
+from r2a.fuzzy_engine import CompiledControlSystemSimulation, FuzzyEngine, extract_knots
+
+OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+             ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def evaluate_expression(expression, parameters):
+    """
+    Evaluates a number or an arithmetic expression (+ - * / and parentheses)
+    of the parameters.
+    """
+    if not isinstance(expression, str):
+        return expression
+
+    def evaluate(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id == 'inf':
+                return math.inf
+            return parameters[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](evaluate(node.left), evaluate(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](evaluate(node.operand))
+        raise ValueError(f'Invalid expression in the fuzzy controller definition - {expression}')
+
+    return evaluate(ast.parse(expression, mode='eval').body)
+
+
+class FuzzyController:
+
+    definitions_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fdash_controllers.json')
+
+    def __init__(self, name, definition, parameters=None, config_parser=None):
+        self.name = name
+        self.definition = definition
+        self.parameters = dict(definition['parameters'], **(parameters or {}))
+        # configuration of the session (fuzzy_engine parameters and cache directory)
+        self.config_parser = config_parser or ConfigurationParser.get_instance()
+        self.control_system = None
+        self.engine = None
+
+    @classmethod
+    def load(cls, name, parameters=None, file_name=None, config_parser=None):
+        """
+        Loads the definition of the controller name from file_name
+        (fdash_controllers.json by default).
+        """
+        with open(file_name or cls.definitions_file) as f:
+            definitions = json.load(f)
+
+        if name not in definitions:
+            raise ValueError(f'Fuzzy controller {name} is not defined in {file_name or cls.definitions_file}')
+
+        return cls(name, definitions[name], parameters, config_parser)
+
+    def get_parameter(self, name):
+        return self.parameters[name]
+
+    def get_output_name(self):
+        return self.definition['output']['name']
+
+    def get_cache_key(self):
+        return {'controller': self.name, 'definition': self.definition, 'parameters': self.parameters}
+
+    def get_control_system(self):
+        """
+        Builds the skfuzzy ControlSystem of the definition, the slowest part
+        of the controller start, so it is only done when needed.
+        """
+        if self.control_system is None:
+            from skfuzzy import control as ctrl
+
+            variables = {}
+            for variable in self.definition['inputs']:
+                variables[variable['name']] = self.__variable(ctrl.Antecedent, variable)
+            output = self.__variable(ctrl.Consequent, self.definition['output'])
+
+            rules = []
+            names = self.definition['rules']['antecedents']
+            for row in self.definition['rules']['table']:
+                antecedent = reduce(operator.and_, [variables[name][label] for name, label in zip(names, row)])
+                rules.append(ctrl.Rule(antecedent, output[row[-1]]))
+
+            self.control_system = ctrl.ControlSystem(rules)
+
+        return self.control_system
+
+    def get_engine(self):
+        """
+        Returns the compiled engine of the definition. It is loaded from the
+        cache if a previous session already compiled and validated it.
+        """
+        if self.engine is None:
+            path = cache_file('fuzzy_engine', self.get_cache_key(), 'npz', self.config_parser)
+            self.engine = FuzzyEngine.load(path)
+
+            if self.engine is None:
+                tolerance = float(self.config_parser.get_parameter('fuzzy_engine_tolerance'))
+                self.engine = self.__compile()
+                self.engine.validate(self.get_control_system(), tolerance=tolerance)
+                self.engine.save(path)
+
+        return self.engine
+
+    def create_simulation(self):
+        """
+        Returns the controller simulation selected by the fuzzy_engine parameter,
+        all of them with the input/compute()/output interface of skfuzzy.
+        """
+        fuzzy_engine = self.config_parser.get_parameter('fuzzy_engine')
+
+        if fuzzy_engine == 'skfuzzy':
+            from skfuzzy import control as ctrl
+            return ctrl.ControlSystemSimulation(self.get_control_system())
+
+        if fuzzy_engine not in ('compiled', 'lookup'):
+            raise ValueError(f'Invalid fuzzy_engine parameter - {fuzzy_engine}')
+
+        engine = self.get_engine()
+
+        if fuzzy_engine == 'lookup':
+            from r2a.fuzzy_lookup import FuzzyLookupTable
+
+            resolution = int(self.config_parser.get_parameter('fuzzy_lookup_resolution'))
+            path = FuzzyLookupTable.cache_path(engine, self.name, self.parameters, resolution, self.config_parser)
+            lookup = FuzzyLookupTable.load(path, engine)
+
+            # the sampling is paid only by the first session
+            if lookup is None:
+                lookup = FuzzyLookupTable.build(engine, resolution)
+                lookup.save(path)
+
+            print(f'> {self.name} lookup table: max error {lookup.max_error:.6f}, mean error {lookup.mean_error:.6f}')
+            return CompiledControlSystemSimulation(lookup)
+
+        return CompiledControlSystemSimulation(engine)
+
+    def __compile(self):
+        # the engine is compiled straight from the definition, skfuzzy only samples the membership functions
+        inputs = []
+        for variable in self.definition['inputs']:
+            universe, memberships = self.__memberships(variable)
+            inputs.append((variable['name'], universe, {label: extract_knots(universe, mf) for label, mf in memberships.items()}))
+
+        universe, memberships = self.__memberships(self.definition['output'])
+        output = (self.get_output_name(), universe, {label: extract_knots(universe, mf) for label, mf in memberships.items()})
+
+        names = self.definition['rules']['antecedents']
+        rules = [(dict(zip(names, row)), row[-1], 1.0) for row in self.definition['rules']['table']]
+
+        return FuzzyEngine(inputs, output, rules)
+
+    def __variable(self, kind, variable):
+        universe, memberships = self.__memberships(variable)
+        fuzzy_variable = kind(universe, variable['name'])
+        for label, mf in memberships.items():
+            fuzzy_variable[label] = mf
+        return fuzzy_variable
+
+    def __memberships(self, variable):
+        import skfuzzy as fuzz
+
+        start, stop, step = [evaluate_expression(value, self.parameters) for value in variable['universe']]
+        universe = np.arange(start, stop, step)
+
+        memberships = {}
+        for label, (function, points) in variable['terms'].items():
+            points = [evaluate_expression(point, self.parameters) for point in points]
+            memberships[label] = getattr(fuzz, function)(universe, points)
+
+        return universe, memberships
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Compiled fuzzy inference engine for the FDASH R2A algorithms.
+
+A fuzzy controller is compiled into NumPy arrays: every membership
+function (trapezoids and triangles sampled over the variable universe) is
+reduced to the few knots of its piecewise linear shape and the rule table
+is stored as an index matrix. The inference uses the same Mamdani method of
+skfuzzy (min for AND, max accumulation and centroid defuzzification), but
+the centroid is computed analytically over the clipped output shape instead
+of over the upsampled universe.
+
+The engine is selected by the fuzzy_engine parameter of dash_client.json:
+    skfuzzy  - the original ControlSystemSimulation
+    compiled - this engine, validated against skfuzzy when it is compiled
+    lookup   - a precomputed table of this engine (see fuzzy_lookup.py)
+The FDASH controllers are built by fuzzy_controller.py.
+
+evaluate() works over NumPy arrays of inputs, so the controllers can also
+be swept offline (see control_surface() and plot_control_surface()).
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from base.cache import write_file
+
+
+def extract_knots(universe, mf):
+    """
+    Returns the knots (x, y) of the piecewise linear function sampled by
+    mf over universe. np.interp over the knots gives the same result of
+    np.interp over the whole sampled membership function.
+    """
+    universe = np.asarray(universe, dtype=np.float64)
+    mf = np.asarray(mf, dtype=np.float64)
+
+    if len(universe) < 3:
+        return universe.copy(), mf.copy()
+
+    slopes = np.diff(mf) / np.diff(universe)
+    changes = np.nonzero(np.abs(np.diff(slopes)) > 1e-9)[0] + 1
+    idx = np.concatenate(([0], changes, [len(universe) - 1]))
+    return universe[idx], mf[idx]
+
+
+def hinge_coefficients(kx, ky):
+    """
+    Writes the piecewise linear function with knots (kx, ky), constant
+    outside of [kx[0], kx[-1]] as np.interp, in the closed form
+        f(x) = ky[0] + sum(c[k] * max(x - kx[k], 0))
+    and returns c. It allows evaluating many functions at once.
+    """
+    slopes = np.concatenate((np.diff(ky) / np.diff(kx), [0.0]))
+    return np.diff(slopes, prepend=0.0)
+
+
+def stack_hinges(functions):
+    """
+    Packs a list of knots (kx, ky) into (base, knots, coefficients) arrays,
+    padding the functions with fewer knots with zero coefficients.
+    """
+    width = max(len(kx) for kx, _ in functions)
+    base = np.array([ky[0] for _, ky in functions], dtype=np.float64)
+    knots = np.zeros((len(functions), width))
+    coefficients = np.zeros((len(functions), width))
+
+    for i, (kx, ky) in enumerate(functions):
+        knots[i, :len(kx)] = kx
+        coefficients[i, :len(kx)] = hinge_coefficients(kx, ky)
+
+    return base, knots, coefficients
+
+
+class FuzzyEngine:
+
+    # number of points evaluated at once by evaluate(), it bounds the memory use
+    chunk_size = 1024
+
+    def __init__(self, inputs, output, rules):
+        """
+        inputs: list of (name, universe, {label: (knots_x, knots_y)})
+        output: (name, universe, {label: (knots_x, knots_y)})
+        rules:  list of ({input name: label}, output label, weight)
+        """
+        self.input_names = [name for name, _, _ in inputs]
+        self.input_bounds = np.array([(np.min(u), np.max(u)) for _, u, _ in inputs], dtype=np.float64)
+
+        # flat list of the antecedent terms, the last one is an always true term
+        functions = []
+        self.term_inputs = []
+        term_index = {}
+        for i, (name, _, terms) in enumerate(inputs):
+            for label, (kx, ky) in terms.items():
+                term_index[(name, label)] = len(functions)
+                functions.append((np.asarray(kx, dtype=np.float64), np.asarray(ky, dtype=np.float64)))
+                self.term_inputs.append(i)
+        true_term = len(functions)
+        functions.append((np.zeros(1), np.ones(1)))
+        self.term_inputs.append(0)
+        self.term_inputs = np.array(self.term_inputs, dtype=np.intp)
+        self.term_base, self.term_knots, self.term_coefficients = stack_hinges(functions)
+
+        self.output_name, output_universe, output_terms = output
+        self.output_bounds = (float(np.min(output_universe)), float(np.max(output_universe)))
+        self.output_labels = list(output_terms.keys())
+        self.output_terms = [(np.asarray(kx, dtype=np.float64), np.asarray(ky, dtype=np.float64))
+                             for kx, ky in output_terms.values()]
+
+        # rule table: antecedent term indexes, consequent term index and weight
+        width = max([len(antecedent) for antecedent, _, _ in rules] + [1])
+        self.rule_terms = np.full((len(rules), width), true_term, dtype=np.intp)
+        self.rule_weights = np.ones(len(rules), dtype=np.float64)
+        self.rule_outputs = np.zeros(len(rules), dtype=np.intp)
+        for r, (antecedent, label, weight) in enumerate(rules):
+            for a, (name, term) in enumerate(antecedent.items()):
+                self.rule_terms[r, a] = term_index[(name, term)]
+            self.rule_outputs[r] = self.output_labels.index(label)
+            self.rule_weights[r] = weight
+
+        self.__compile_output_shape()
+
+    def digest(self):
+        """
+        Returns a hash of the compiled controller, it changes with any
+        membership function or rule.
+        """
+        digest = hashlib.sha1(repr((self.input_names, self.output_name, self.output_labels, self.output_bounds)).encode())
+        arrays = [self.input_bounds, self.term_inputs, self.term_base, self.term_knots, self.term_coefficients,
+                  self.rule_terms, self.rule_weights, self.rule_outputs]
+        for array in arrays + [k for term in self.output_terms for k in term]:
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def save(self, path):
+        description = {'input_names': self.input_names, 'output_name': self.output_name,
+                       'output_labels': self.output_labels, 'output_bounds': self.output_bounds}
+        output_terms = {f'output_term_{j}': np.array(term) for j, term in enumerate(self.output_terms)}
+
+        # written aside and renamed, concurrent sessions never read a partial file
+        with write_file(path) as f:
+            np.savez(f, description=np.array(json.dumps(description)), input_bounds=self.input_bounds,
+                     term_inputs=self.term_inputs, term_base=self.term_base, term_knots=self.term_knots,
+                     term_coefficients=self.term_coefficients, rule_terms=self.rule_terms,
+                     rule_weights=self.rule_weights, rule_outputs=self.rule_outputs, **output_terms)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an engine saved by save(), it returns None if the file does not exist.
+        """
+        if not os.path.exists(path):
+            return None
+
+        engine = cls.__new__(cls)
+        with np.load(path) as data:
+            description = json.loads(str(data['description']))
+            engine.input_names = description['input_names']
+            engine.output_name = description['output_name']
+            engine.output_labels = description['output_labels']
+            engine.output_bounds = tuple(description['output_bounds'])
+            for name in ('input_bounds', 'term_inputs', 'term_base', 'term_knots', 'term_coefficients',
+                         'rule_terms', 'rule_weights', 'rule_outputs'):
+                setattr(engine, name, data[name])
+            engine.output_terms = [tuple(data[f'output_term_{j}']) for j in range(len(engine.output_labels))]
+
+        engine.__compile_output_shape()
+        return engine
+
+    def __compile_output_shape(self):
+        """
+        Precomputes everything the accumulation and the centroid need that does
+        not depend on the activation levels: the rules of every output term,
+        the knots of all output terms, the points where two sloped pieces cross
+        each other and the list of sloped pieces.
+        """
+        self.output_rules = (self.rule_outputs[None, :] == np.arange(len(self.output_terms))[:, None])[:, :, None]
+
+        low, high = self.output_bounds
+        knots = [low, high]
+        segments = []
+        for kx, ky in self.output_terms:
+            knots.extend(kx)
+            for i in range(len(kx) - 1):
+                if ky[i] != ky[i + 1] and kx[i] != kx[i + 1]:
+                    segments.append((kx[i], ky[i], kx[i + 1], ky[i + 1]))
+
+        segments = np.array(segments, dtype=np.float64).reshape(-1, 4)
+        x0, y0, x1, y1 = segments.T
+        slope = (y1 - y0) / (x1 - x0)
+
+        # crossings between sloped pieces, they do not depend on the activations
+        for i in range(len(segments)):
+            for j in range(i + 1, len(segments)):
+                if slope[i] == slope[j]:
+                    continue
+                x = (y0[j] - y0[i] + slope[i] * x0[i] - slope[j] * x0[j]) / (slope[i] - slope[j])
+                if max(x0[i], x0[j]) < x < min(x1[i], x1[j]):
+                    knots.append(x)
+
+        self.static_knots = np.unique(np.clip(knots, low, high))[:, None]
+        self.segment_x = x0[None, :, None]
+        self.segment_y = y0[None, :, None]
+        self.segment_dx = (x1 - x0)[None, :, None]
+        self.segment_inverse_dy = (1 / (y1 - y0))[None, :, None]
+
+    def evaluate(self, inputs):
+        """
+        Vectorized inference. inputs maps every input name to a number or a
+        NumPy array (broadcastable among them). It returns an array with the
+        crisp output, NaN where no rule was activated.
+        """
+        values = np.broadcast_arrays(*[np.asarray(inputs[name], dtype=np.float64) for name in self.input_names])
+        shape = values[0].shape
+        values = np.array([v.ravel() for v in values])
+        values = np.minimum(np.maximum(values, self.input_bounds[:, :1]), self.input_bounds[:, 1:])
+
+        if values.shape[1] <= self.chunk_size:
+            return self.__infer(values).reshape(shape)
+
+        output = np.empty(values.shape[1])
+        for i in range(0, values.shape[1], self.chunk_size):
+            output[i:i + self.chunk_size] = self.__infer(values[:, i:i + self.chunk_size])
+        return output.reshape(shape)
+
+    def compute(self, **inputs):
+        """
+        Scalar inference, the crisp output or NaN when no rule is activated.
+        """
+        values = np.array([[inputs[name]] for name in self.input_names], dtype=np.float64)
+        values = np.minimum(np.maximum(values, self.input_bounds[:, :1]), self.input_bounds[:, 1:])
+        return float(self.__infer(values)[0])
+
+    def __infer(self, values):
+        # fuzzification, (terms, points)
+        x = values[self.term_inputs][:, :, None]
+        memberships = self.term_base[:, None] + (np.maximum(x - self.term_knots[:, None, :], 0)
+                                                 * self.term_coefficients[:, None, :]).sum(axis=2)
+        # the closed form leaves rounding residues where the membership is zero
+        memberships[memberships < 1e-12] = 0.0
+
+        # rule firing (AND) and accumulation (max) for each output term, (output terms, points)
+        firing = memberships[self.rule_terms].min(axis=1) * self.rule_weights[:, None]
+        activation = np.where(self.output_rules, firing[None, :, :], 0.0).max(axis=1)
+
+        return self.__centroid(activation)
+
+    def __centroid(self, activation):
+        """
+        Centroid of max_j(min(activation_j, term_j)) computed exactly. Between
+        the knots below, every clipped term is linear, so the aggregated shape
+        is piecewise linear and its centroid has a closed form.
+        """
+        n = activation.shape[1]
+
+        # points where a sloped piece crosses any activation level, out of range
+        # crossings fall on the piece ends, which are already knots
+        t = np.minimum(np.maximum((activation[:, None, :] - self.segment_y) * self.segment_inverse_dy, 0), 1)
+        crossings = (self.segment_x + t * self.segment_dx).reshape(-1, n)
+
+        knots = np.concatenate((np.broadcast_to(self.static_knots, (len(self.static_knots), n)), crossings))
+        knots.sort(axis=0)
+
+        # aggregated output shape at the knots, (knots, points)
+        shape = np.zeros_like(knots)
+        for j, (kx, ky) in enumerate(self.output_terms):
+            np.maximum(shape, np.minimum(np.interp(knots, kx, ky), activation[j]), out=shape)
+
+        xa, xb, ya, yb = knots[:-1], knots[1:], shape[:-1], shape[1:]
+        dx = xb - xa
+        area = (dx * (ya + yb)).sum(axis=0) / 2
+        moment = (dx * (xa * (2 * ya + yb) + xb * (ya + 2 * yb))).sum(axis=0) / 6
+
+        return np.divide(moment, area, out=np.full(n, np.nan), where=area > 0)
+
+    def validate(self, control_system, samples=10, tolerance=0.01, seed=0):
+        """
+        Compares the engine with skfuzzy over random inputs sampled in the
+        universes. It returns the maximum absolute error and raises ValueError
+        if it is greater than tolerance.
+        """
+        from skfuzzy import control as ctrl
+
+        simulation = ctrl.ControlSystemSimulation(control_system)
+        random = np.random.default_rng(seed)
+        max_error = 0.0
+
+        for _ in range(samples):
+            inputs = {name: random.uniform(low, high) for name, (low, high) in zip(self.input_names, self.input_bounds)}
+
+            output = float(self.evaluate(inputs))
+            if np.isnan(output):
+                # no rule is activated by this point, there is nothing to compare
+                continue
+
+            for name, value in inputs.items():
+                simulation.input[name] = value
+            simulation.compute()
+
+            # skfuzzy leaves no output when it activates no rule, a mismatch
+            error = abs(simulation.output.get(self.output_name, np.inf) - output)
+            max_error = max(max_error, error)
+
+        if max_error > tolerance:
+            raise ValueError(f'Compiled fuzzy engine differs from skfuzzy by {max_error} (tolerance {tolerance})')
+
+        return max_error
+
+
+class CompiledControlSystemSimulation:
+    """
+    Drop-in replacement of skfuzzy ControlSystemSimulation backed by a
+    FuzzyEngine or a FuzzyLookupTable.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.input = {}
+        self.output = {}
+
+    def compute(self):
+        # as the (lenient) skfuzzy simulation, no output when no rule is activated
+        output = self.engine.compute(**self.input)
+        self.output = {} if np.isnan(output) else {self.engine.output_name: output}
+
+
+def control_surface(engine, x_name, y_name=None, fixed=None, resolution=101):
+    """
+    Samples the controller output over the universe of one input (x, z) or
+    two inputs (X, Y, Z). The other inputs are set by fixed or, by default,
+    to the middle of their universes.
+    """
+    bounds = dict(zip(engine.input_names, engine.input_bounds))
+    inputs = {name: (low + high) / 2 for name, (low, high) in bounds.items()}
+    inputs.update(fixed or {})
+
+    x = np.linspace(*bounds[x_name], resolution)
+    if y_name is None:
+        inputs[x_name] = x
+        return x, engine.evaluate(inputs)
+
+    y = np.linspace(*bounds[y_name], resolution)
+    inputs[x_name], inputs[y_name] = np.meshgrid(x, y)
+    return inputs[x_name], inputs[y_name], engine.evaluate(inputs)
+
+
+def plot_control_surface(engine, x_name, y_name=None, fixed=None, resolution=101, file_name=None):
+    """
+    Plots the 2-D control curve (one input) or the 3-D control surface (two
+    inputs) of a controller. The figure is saved when file_name is given.
+    """
+    import matplotlib.pyplot as plt
+
+    surface = control_surface(engine, x_name, y_name, fixed, resolution)
+    figure = plt.figure()
+
+    if y_name is None:
+        ax = figure.add_subplot()
+        ax.plot(*surface)
+    else:
+        ax = figure.add_subplot(projection='3d')
+        ax.plot_surface(*surface, cmap='viridis', linewidth=0.4, antialiased=True)
+        ax.set_ylabel(y_name)
+        ax.set_zlabel(engine.output_name)
+
+    ax.set_xlabel(x_name)
+    ax.set_title(f'{engine.output_name} control surface')
+
+    if file_name is not None:
+        figure.savefig(file_name)
+        plt.close(figure)
+
+    return figure
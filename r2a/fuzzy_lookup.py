@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Precomputed lookup table for the FDASH fuzzy controllers.
+
+The controller output is sampled once over a grid of its inputs and the
+decisions are answered by multilinear interpolation of the grid. Every
+grid axis joins a uniform sampling of the input universe with the knots
+of the input memberships, where the controller output bends the most.
+
+The table is stored in the cache directory keyed by the controller name,
+its membership parameters, the grid resolution and the compiled rule base,
+together with the maximum and mean errors measured against the exact
+controller.
+"""
+
+import bisect
+import math
+import os
+
+import numpy as np
+
+from base.cache import cache_file, write_file
+
+
+class FuzzyLookupTable:
+
+    def __init__(self, output_name, input_names, axes, table, errors):
+        self.output_name = output_name
+        self.input_names = input_names
+        self.axes = axes
+        self.table = table
+        self.max_error, self.mean_error = errors
+
+        self.lower = np.array([axis[0] for axis in axes])
+        self.upper = np.array([axis[-1] for axis in axes])
+        self.flat_table = table.ravel()
+        # cells without a crisp output (no rule activated) are left out of the interpolation
+        self.sparse = bool(np.isnan(self.flat_table).any())
+        self.strides = np.array(table.strides) // table.itemsize
+
+        # plain Python copies used by the scalar lookup
+        self.scalar_table = self.flat_table.tolist()
+        self.scalar_axes = [(name, axis.tolist(), float(axis[0]), float(axis[-1]), int(stride))
+                            for name, axis, stride in zip(input_names, axes, self.strides)]
+
+        # offsets of the 2^d corners of a grid cell
+        dimensions = len(axes)
+        self.corners = (np.arange(2 ** dimensions)[:, None] >> np.arange(dimensions)[None, :]) & 1
+        self.corner_offsets = self.corners @ self.strides
+
+    @classmethod
+    def build(cls, engine, resolution, samples=10000, seed=0):
+        axes = []
+        for i, (low, high) in enumerate(engine.input_bounds):
+            # the bends of the memberships are the knots with a nonzero hinge coefficient
+            rows = engine.term_inputs == i
+            knots = engine.term_knots[rows][engine.term_coefficients[rows] != 0]
+            knots = knots[(knots > low) & (knots < high)]
+            axes.append(np.unique(np.concatenate((np.linspace(low, high, resolution), knots))))
+
+        grid = np.meshgrid(*axes, indexing='ij')
+        table = engine.evaluate(dict(zip(engine.input_names, grid)))
+
+        lookup = cls(engine.output_name, engine.input_names, axes, table, (0.0, 0.0))
+
+        # error against the exact controller over random inputs
+        random = np.random.default_rng(seed)
+        inputs = {name: random.uniform(low, high, samples) for name, (low, high) in zip(engine.input_names, engine.input_bounds)}
+        errors = np.abs(lookup.evaluate(inputs) - engine.evaluate(inputs))
+        errors = errors[~np.isnan(errors)]
+        if len(errors) > 0:
+            lookup.max_error, lookup.mean_error = float(errors.max()), float(errors.mean())
+
+        return lookup
+
+    @staticmethod
+    def cache_path(engine, name, parameters, resolution, config_parser=None):
+        return cache_file('fuzzy_lookup', {'controller': name, 'parameters': parameters,
+                                           'resolution': resolution, 'engine': engine.digest()}, 'npz', config_parser)
+
+    @classmethod
+    def load(cls, path, engine):
+        """
+        Loads a table from the cache, it returns None if it was not built yet.
+        """
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            axes = [data[f'axis_{i}'] for i in range(len(engine.input_names))]
+            return cls(engine.output_name, engine.input_names, axes, data['table'], tuple(data['errors']))
+
+    def save(self, path):
+        # written aside and renamed, concurrent sessions never read a partial file
+        with write_file(path) as f:
+            np.savez(f, table=self.table, errors=np.array([self.max_error, self.mean_error]),
+                     **{f'axis_{i}': axis for i, axis in enumerate(self.axes)})
+
+    def evaluate(self, inputs):
+        """
+        Vectorized lookup, inputs maps every input name to a number or a
+        NumPy array. Values out of the universes are clipped as in skfuzzy.
+        """
+        values = np.broadcast_arrays(*[np.asarray(inputs[name], dtype=np.float64) for name in self.input_names])
+        shape = values[0].shape
+        values = np.array([v.ravel() for v in values])
+        return self.__interpolate(values).reshape(shape)
+
+    def compute(self, **inputs):
+        """
+        Scalar lookup in plain Python, for a single decision it is much
+        cheaper than the NumPy calls of evaluate(). NaN when no rule is
+        activated.
+        """
+        # cell corners as (table position, interpolation weight)
+        corners = [(0, 1.0)]
+        for name, axis, low, high, stride in self.scalar_axes:
+            value = min(max(float(inputs[name]), low), high)
+            cell = min(bisect.bisect_right(axis, value) - 1, len(axis) - 2)
+            f = (value - axis[cell]) / (axis[cell + 1] - axis[cell])
+            corners = [(c + cell * stride, w * (1 - f)) for c, w in corners] + \
+                      [(c + (cell + 1) * stride, w * f) for c, w in corners]
+
+        # NaN corners (no crisp output) are left out, as in evaluate()
+        output = total = 0.0
+        for c, w in corners:
+            value = self.scalar_table[c]
+            if value == value:
+                output += value * w
+                total += w
+        return output / total if total > 0 else math.nan
+
+    def __interpolate(self, values):
+        values = np.minimum(np.maximum(values, self.lower[:, None]), self.upper[:, None])
+
+        # cell index and relative position inside the cell for every dimension
+        cells = np.empty(values.shape, dtype=np.intp)
+        fractions = np.empty(values.shape)
+        for d, axis in enumerate(self.axes):
+            cell = np.minimum(np.searchsorted(axis, values[d], side='right') - 1, len(axis) - 2)
+            cells[d] = cell
+            fractions[d] = (values[d] - axis[cell]) / (axis[cell + 1] - axis[cell])
+
+        base = self.strides @ cells
+        weights = np.where(self.corners[:, :, None], fractions[None, :, :], 1 - fractions[None, :, :]).prod(axis=1)
+        corners = self.flat_table[base[None, :] + self.corner_offsets[:, None]]
+
+        if not self.sparse:
+            return (corners * weights).sum(axis=0)
+
+        weights = np.where(np.isnan(corners), 0.0, weights)
+        total = weights.sum(axis=0)
+        output = (np.nan_to_num(corners) * weights).sum(axis=0)
+        return np.divide(output, total, out=np.full(len(total), np.nan), where=total > 0)
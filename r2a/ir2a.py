@@ -13,16 +13,18 @@ It is necessary to implement all the @abstractmethod methods to generate a new R
 from base.simple_module import SimpleModule
 from abc import ABCMeta, abstractmethod
 from base.message import Message, MessageKind
-from base.whiteboard import Whiteboard
 
 
 class IR2A(SimpleModule):
 
-    def __init__(self, id):
-        SimpleModule.__init__(self, id)
+    def __init__(self, id, context=None):
+        SimpleModule.__init__(self, id, context)
 
         # Whiteboard object to change statistical information between Player and R2A algorithm
-        self.whiteboard = Whiteboard.get_instance()
+        self.whiteboard = self.context.whiteboard
+
+        # Timer object, it follows the simulated clock in the virtual time mode
+        self.timer = self.context.timer
 
     @abstractmethod
     def handle_xml_request(self, msg):
@@ -40,6 +42,39 @@ class IR2A(SimpleModule):
     def handle_segment_size_response(self, msg):
         pass
 
+    def handle_segment_download_progress(self, msg, received, total, elapsed):
+        """
+        Optional hook consulted by the ConnectionHandler while the body of
+        the segment requested by msg is downloaded (segment_abandonment
+        parameter). received bytes of total (None if unknown) took elapsed
+        seconds. It returns a lower quality_id to abandon the download and
+        request the segment again, or None to go on.
+        """
+        return None
+
+    def get_abandonment_quality_id(self, msg, received, total, elapsed, qi):
+        """
+        Buffer based abandonment policy for handle_segment_download_progress().
+        When the rest of the segment would take longer than the video left in
+        the buffer at the current throughput, it returns the greatest quality
+        of qi lower than the requested one whose whole segment fits in the
+        buffer (or the lowest one), otherwise None.
+        """
+        if received == 0 or elapsed <= 0 or total is None:
+            return None
+
+        throughput = 8 * received / elapsed
+        buffer_level = self.whiteboard.get_amount_video_to_play()
+        if 8 * (total - received) / throughput <= buffer_level:
+            return None
+
+        lower_qi = [quality_id for quality_id in qi if quality_id < msg.get_quality_id()]
+        if len(lower_qi) == 0:
+            return None
+
+        fitting_qi = [quality_id for quality_id in lower_qi if quality_id * msg.get_segment_size() / throughput <= buffer_level]
+        return max(fitting_qi) if len(fitting_qi) > 0 else min(lower_qi)
+
     @abstractmethod
     def initialize(self):
         SimpleModule.initialize(self)
@@ -1,19 +1,19 @@
 from r2a.ir2a import IR2A
 from player.parser import *
-import time
-from statistics import mean
+from r2a.estimators import create_estimator
 
 
 class R2A_AverageThroughput(IR2A):
 
-    def __init__(self, id):
-        IR2A.__init__(self, id)
-        self.throughputs = []
+    def __init__(self, id, context=None):
+        IR2A.__init__(self, id, context)
+        # média de todos os throughputs medidos, sem guardá-los
+        self.throughputs = create_estimator(str(self.context.get_parameter('r2a_throughput_estimator')))
         self.request_time = 0
         self.qi = []
 
     def handle_xml_request(self, msg):
-        self.request_time = time.perf_counter()
+        self.request_time = self.timer.perf_counter()
         self.send_down(msg)
 
     def handle_xml_response(self, msg):
@@ -21,14 +21,14 @@ class R2A_AverageThroughput(IR2A):
         parsed_mpd = parse_mpd(msg.get_payload())
         self.qi = parsed_mpd.get_qi()
 
-        t = time.perf_counter() - self.request_time
-        self.throughputs.append(msg.get_bit_length() / t)
+        t = self.timer.perf_counter() - self.request_time
+        self.throughputs.add(self.timer.perf_counter(), msg.get_bit_length() / t)
 
         self.send_up(msg)
 
     def handle_segment_size_request(self, msg):
-        self.request_time = time.perf_counter()
-        avg = mean(self.throughputs) / 2
+        self.request_time = self.timer.perf_counter()
+        avg = self.throughputs.get_estimate(self.request_time) / 2
 
         selected_qi = self.qi[0]
         for i in self.qi:
@@ -39,8 +39,8 @@ class R2A_AverageThroughput(IR2A):
         self.send_down(msg)
 
     def handle_segment_size_response(self, msg):
-        t = time.perf_counter() - self.request_time
-        self.throughputs.append(msg.get_bit_length() / t)
+        t = self.timer.perf_counter() - self.request_time
+        self.throughputs.add(self.timer.perf_counter(), msg.get_bit_length() / t)
         self.send_up(msg)
 
     def initialize(self):
@@ -18,8 +18,8 @@ from r2a.ir2a import IR2A
 
 class R2AFixed(IR2A):
 
-    def __init__(self, id):
-        IR2A.__init__(self, id)
+    def __init__(self, id, context=None):
+        IR2A.__init__(self, id, context)
         self.parsed_mpd = ''
         self.qi = []
 
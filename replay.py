@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Replays a recorded session (session_record parameter) with another R2A:
+
+    python3 replay.py session.log R2A_FDASH_2
+
+The R2A is driven against the network conditions of the recording, the
+bandwidth trace observed in its downloads, in the virtual time and with the
+simulated connection handler, so a replay runs at full speed and is
+reproducible. The segment sizes come from the segment_index of the recorded
+configuration or, when it has none, from the sizes of the recorded
+downloads. The summaries of both sessions are printed at the end.
+"""
+
+import argparse
+
+import numpy as np
+
+from base.cache import cache_file
+from base.configuration_parser import ConfigurationParser
+from base.session_log import SessionLog
+from connection.segment_index import SegmentSizeIndex
+from connection.trace_profile import TraceProfile
+from dash_client import DashClient
+from player.parser import parse_mpd
+
+
+def recorded_segment_index(log):
+    """
+    Index of the recorded presentation. Each segment was downloaded in a
+    single quality, the sizes of the others are scaled by the bandwidth
+    ratio (as in SegmentSizeIndex.synthetic()).
+    """
+    parsed_mpd = parse_mpd(log.mpd)
+    segment_template = parsed_mpd.get_segment_template()
+    segment_duration = int(segment_template['duration']) / int(segment_template.get('timescale', 1))
+
+    segments = log.get_segments()
+    segments = segments[segments['found'] == 1]
+    complexity = segments['bit_length'] / (segments['quality_id'] * segment_duration)
+
+    bandwidths = np.asarray(parsed_mpd.get_qi(), dtype=np.float64)
+    sizes = np.round(bandwidths * segment_duration / 8 * complexity[:, np.newaxis])
+    return SegmentSizeIndex(bandwidths, np.maximum(sizes, 1), segment_duration, log.mpd)
+
+
+def print_summary(title, summary):
+    print(f'> {title}: {summary["r2a_algorithm"]}')
+    print(f'  >> Segments: {summary["segments"]}')
+    print(f'  >> Average quality: {round(summary["average_quality_id"] / 1e6, 3)} Mbps')
+    print(f'  >> Switches: {summary["switches"]}')
+    print(f'  >> Duration: {round(summary["duration"], 2)} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays a recorded pyDash session with another R2A')
+    parser.add_argument('log', help='session log written with the session_record parameter')
+    parser.add_argument('r2a_algorithm', help='R2A class of the replay, e.g. R2A_FDASH_2')
+    parser.add_argument('--record', help='session log of the replay (default: in the cache directory)')
+    parser.add_argument('--step', type=float, default=0.1, help='sampling step (s) of the bandwidth trace')
+    args = parser.parse_args()
+
+    log = SessionLog.load(args.log)
+
+    # the recorded configuration, completed by the dash_client.json of the current version
+    config_parser = ConfigurationParser.get_instance()
+    for key, value in log.configuration.items():
+        config_parser.set_parameter(key, value)
+
+    trace_path = cache_file('replays', {'log': args.log, 'events': len(log.events), 'samples': len(log.samples),
+                                        'end': float(log.samples['time'][-1]), 'step': args.step}, 'trace')
+    TraceProfile.write(trace_path, log.get_trace(args.step), args.step)
+
+    if not log.configuration.get('segment_index'):
+        index_path = cache_file('replays', {'log': args.log, 'events': len(log.events)}, 'npz')
+        recorded_segment_index(log).save(index_path)
+        config_parser.set_parameter('segment_index', index_path)
+
+    record_path = args.record or cache_file('replays', {'log': args.log, 'r2a_algorithm': args.r2a_algorithm},
+                                            'session')
+    overrides = {
+        'r2a_algorithm': args.r2a_algorithm,
+        'virtual_time': True,
+        'connection_handler': 'simulation',
+        'traffic_shaping_profile': 'trace',
+        'traffic_shaping_trace': trace_path,
+        'traffic_shaping_trace_scale': 1,
+        'session_record': record_path,
+    }
+    for key, value in overrides.items():
+        config_parser.set_parameter(key, value)
+
+    DashClient().run_application()
+
+    print_summary('Recorded session', log.get_summary())
+    print_summary('Replayed session', SessionLog.load(record_path).get_summary())
+
+
+if __name__ == '__main__':
+    main()
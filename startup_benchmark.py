@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Measures the start time of a session, from the launch of python main.py to
+its first segment request:
+
+    python3 startup_benchmark.py --runs 20
+
+Each run executes main.py in a temporary directory with the dash_client.json
+of the current directory, updated by --parameters (by default the virtual
+time and the simulation mode, so no server is needed and the time is only
+the start of the process). The caches (fuzzy engines, traces...) of the
+current directory are shared by the runs and filled by a first run that is
+not measured, as when a grid launches thousands of short sessions. The
+session is stopped at the first request.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# line printed by the Player when it sends a segment request
+FIRST_REQUEST = '> request:'
+
+
+def time_to_first_request(directory, command):
+    """
+    Seconds from the launch of command in directory to the first segment
+    request printed, None if the session ends without a request.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in process.stdout:
+            if FIRST_REQUEST in line:
+                return time.perf_counter() - start
+        return None
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the time of python main.py to its first request')
+    parser.add_argument('--runs', type=int, default=10, help='measured runs')
+    parser.add_argument('--parameters', default='{"virtual_time": true, "connection_handler": "simulation"}',
+                        help='JSON parameters over the dash_client.json of the current directory')
+    args = parser.parse_args()
+
+    with open('dash_client.json') as f:
+        configuration = json.load(f)
+    configuration.update(json.loads(args.parameters))
+    configuration['cache_directory'] = os.path.abspath(configuration['cache_directory'])
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'results'))
+        with open(os.path.join(directory, 'dash_client.json'), 'w') as f:
+            json.dump(configuration, f, indent=2)
+
+        # the interpreter alone, for reference
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        interpreter = time.perf_counter() - start
+
+        # -u: the request line is received as soon as it is printed
+        command = [sys.executable, '-u', MAIN]
+        if time_to_first_request(directory, command) is None:
+            raise RuntimeError('The session ended without a segment request, see the dash_client.json parameters')
+
+        times = [time_to_first_request(directory, command) for _ in range(args.runs)]
+
+    print(f'> Time to the first request ({configuration["r2a_algorithm"]}, {args.runs} runs)')
+    print(f'  >> Median: {round(statistics.median(times) * 1000, 1)} ms')
+    print(f'  >> Min: {round(min(times) * 1000, 1)} ms, max: {round(max(times) * 1000, 1)} ms')
+    print(f'  >> Python interpreter: {round(interpreter * 1000, 1)} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the throughput estimators of the R2A algorithms.
+"""
+
+import statistics
+
+import numpy as np
+import pytest
+
+from r2a.estimators import (Ewma, KalmanEstimator, StreamingPercentile, WindowHarmonicMean, WindowMean,
+                            create_estimator)
+
+
+def test_window_mean_of_every_sample():
+    estimator = WindowMean()
+
+    assert estimator.get_estimate() is None
+    for time, value in enumerate([1, 2, 3, 6]):
+        estimator.add(time, value)
+
+    assert len(estimator) == 4
+    assert estimator.get_estimate(100) == 3
+    assert estimator.get_last() == 6
+    # nothing is stored without a window or a size
+    assert not estimator.samples
+
+
+def test_window_mean_discards_the_old_samples():
+    estimator = WindowMean(window=2)
+    for time, value in enumerate([10, 1, 2, 3]):
+        estimator.add(time, value)
+
+    # at 3, the sample of 0 is older than 2 s
+    assert estimator.get_mean(3) == 2
+    assert len(estimator) == 3
+    assert estimator.get_mean(10) is None
+
+
+def test_window_mean_of_the_last_samples():
+    estimator = WindowMean(size=3)
+    for time, value in enumerate([100, 200, 1, 2, 3]):
+        estimator.add(time, value)
+
+    assert len(estimator) == 3
+    assert estimator.get_mean() == 2
+
+
+def test_window_mean_keeps_exact_sums():
+    values = np.random.default_rng(0).lognormal(10, 2, 10000)
+    estimator = WindowMean(size=10)
+    for time, value in enumerate(values):
+        estimator.add(time, value)
+
+    assert estimator.get_mean() == pytest.approx(values[-10:].mean(), rel=1e-12)
+    assert estimator.get_harmonic_mean() == pytest.approx(statistics.harmonic_mean(values[-10:]), rel=1e-12)
+
+
+def test_harmonic_mean():
+    estimator = WindowHarmonicMean()
+    for time, value in enumerate([1, 2, 4]):
+        estimator.add(time, value)
+
+    assert estimator.get_estimate() == pytest.approx(statistics.harmonic_mean([1, 2, 4]))
+
+
+def test_harmonic_mean_with_zeros():
+    estimator = WindowHarmonicMean(window=1)
+    for time, value in enumerate([0, 2, 4]):
+        estimator.add(time, value)
+
+    assert estimator.get_estimate() == 0.0
+    # the zero leaves the window
+    assert estimator.get_estimate(2) == pytest.approx(statistics.harmonic_mean([2, 4]))
+
+
+def test_ewma():
+    estimator = Ewma(0.25)
+
+    assert estimator.get_estimate() is None
+    estimator.add(0, 8)
+    estimator.add(1, 4)
+
+    assert estimator.get_estimate() == 7
+    assert estimator.get_last() == 4
+
+
+def test_streaming_percentile():
+    values = np.random.default_rng(1).uniform(0, 1000, 20000)
+    estimator = StreamingPercentile(20)
+
+    assert estimator.get_estimate() is None
+    for time, value in enumerate(values):
+        estimator.add(time, value)
+
+    assert estimator.get_estimate() == pytest.approx(np.percentile(values, 20), rel=0.02)
+
+
+def test_streaming_percentile_of_few_samples():
+    estimator = StreamingPercentile(50)
+    for time, value in enumerate([5, 1, 3]):
+        estimator.add(time, value)
+
+    assert estimator.get_estimate() == 3
+
+
+def test_kalman_converges_to_a_constant_throughput():
+    estimator = KalmanEstimator()
+    estimator.add(0, 1000)
+    for time in range(1, 50):
+        estimator.add(time, 2000)
+
+    assert estimator.get_estimate() == pytest.approx(2000, rel=0.01)
+    assert estimator.get_variance() > 0
+
+
+def test_kalman_recovers_from_a_zero_estimate():
+    estimator = KalmanEstimator()
+    estimator.add(0, 0)
+    estimator.add(1, 500)
+
+    assert estimator.get_estimate() == 500
+
+
+@pytest.mark.parametrize('name, cls', [('window_mean', WindowMean), ('window_harmonic_mean', WindowHarmonicMean),
+                                       ('ewma', Ewma), ('percentile', StreamingPercentile),
+                                       ('kalman', KalmanEstimator)])
+def test_create_estimator(name, cls):
+    assert type(create_estimator(name, 10)) is cls
+
+
+def test_create_an_invalid_estimator():
+    with pytest.raises(ValueError):
+        create_estimator('median')
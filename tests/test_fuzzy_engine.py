@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the compiled fuzzy engine and of the lookup table against the
+skfuzzy simulation of the FDASH controllers.
+"""
+
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from base.configuration_parser import ConfigurationParser
+from r2a.fuzzy_controller import FuzzyController
+from r2a.fuzzy_engine import CompiledControlSystemSimulation, FuzzyEngine
+from r2a.fuzzy_lookup import FuzzyLookupTable
+
+DASH_CLIENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash_client.json')
+
+# maximum difference to skfuzzy, the centroid is not computed on the same universe
+TOLERANCE = 0.01
+
+
+@pytest.fixture
+def config_parser(tmp_path):
+    with open(DASH_CLIENT) as f:
+        parameters = json.load(f)
+    parameters['cache_directory'] = str(tmp_path)
+    return ConfigurationParser(parameters)
+
+
+def load_controller(name, config_parser, fuzzy_engine='compiled'):
+    config_parser.set_parameter('fuzzy_engine', fuzzy_engine)
+    return FuzzyController.load(name, {'buff_max': 60}, config_parser=config_parser)
+
+
+def grid(engine, points):
+    axes = [np.linspace(low, high, points) for low, high in engine.input_bounds]
+    return [dict(zip(engine.input_names, values)) for values in itertools.product(*axes)]
+
+
+def simulate(simulation, inputs):
+    for name, value in inputs.items():
+        simulation.input[name] = value
+    simulation.compute()
+    return simulation.output
+
+
+@pytest.mark.parametrize('name, points', [('R2A_FDASH', 7), ('R2A_FDASH_2', 4)])
+def test_compiled_engine_matches_skfuzzy(name, points, config_parser):
+    controller = load_controller(name, config_parser)
+    engine = controller.get_engine()
+    reference = load_controller(name, config_parser, 'skfuzzy').create_simulation()
+    compiled = controller.create_simulation()
+    output_name = controller.get_output_name()
+
+    for inputs in grid(engine, points):
+        expected = simulate(reference, inputs)
+        output = simulate(compiled, dict(inputs))
+
+        assert output.keys() == expected.keys()
+        if expected:
+            assert output[output_name] == pytest.approx(expected[output_name], abs=TOLERANCE)
+
+
+def test_evaluate_matches_compute(config_parser):
+    engine = load_controller('R2A_FDASH_2', config_parser).get_engine()
+    points = grid(engine, 5)
+
+    outputs = engine.evaluate({name: np.array([p[name] for p in points]) for name in engine.input_names})
+
+    np.testing.assert_allclose(outputs, [engine.compute(**p) for p in points], rtol=1e-12)
+
+
+def test_engine_is_saved_in_the_cache(config_parser):
+    controller = load_controller('R2A_FDASH', config_parser)
+    engine = controller.get_engine()
+
+    files = os.listdir(os.path.join(config_parser.get_parameter('cache_directory'), 'fuzzy_engine'))
+    assert len(files) == 1
+    loaded = FuzzyEngine.load(os.path.join(config_parser.get_parameter('cache_directory'), 'fuzzy_engine', files[0]))
+    assert loaded.compute(buff_time=20, buff_time_diff=1) == engine.compute(buff_time=20, buff_time_diff=1)
+
+
+def test_validate_rejects_a_different_controller(config_parser):
+    engine = load_controller('R2A_FDASH', config_parser).get_engine()
+    other = load_controller('R2A_FDASH', config_parser)
+    other.parameters['P2'] = 4
+
+    with pytest.raises(ValueError):
+        engine.validate(other.get_control_system(), samples=50, tolerance=1e-6)
+
+
+def test_no_output_when_no_rule_is_activated():
+    class Engine:
+        output_name = 'f'
+
+        def compute(self, **inputs):
+            return math.nan
+
+    simulation = CompiledControlSystemSimulation(Engine())
+
+    assert simulate(simulation, {'x': 0}) == {}
+
+
+def test_lookup_table_approximates_the_engine(config_parser):
+    engine = load_controller('R2A_FDASH', config_parser).get_engine()
+    lookup = FuzzyLookupTable.build(engine, 41)
+
+    for inputs in grid(engine, 9):
+        assert lookup.compute(**inputs) == pytest.approx(engine.compute(**inputs), abs=TOLERANCE)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the PlaybackBuffer of the Player.
+"""
+
+import numpy as np
+import pytest
+
+from player.playback_buffer import PlaybackBuffer
+
+
+def filled_buffer(segments):
+    buffer = PlaybackBuffer()
+    for i, (qi, duration) in enumerate(segments):
+        buffer.add_segment(qi, duration, float(i))
+    return buffer
+
+
+def test_empty_buffer():
+    buffer = PlaybackBuffer()
+
+    assert len(buffer) == 0
+    assert buffer.get_duration() == 0
+    assert len(buffer.get_runs()) == 0
+    assert len(buffer.get_segments()) == 0
+    assert len(buffer.get_qi_per_second()) == 0
+
+
+def test_segments_of_the_same_duration_are_a_single_run():
+    buffer = filled_buffer([(qi, 1) for qi in [0, 5, 5, 19, 3]])
+
+    assert len(buffer) == 5
+    assert buffer.get_duration() == 5
+    assert buffer.get_runs().tolist() == [[1, 5]]
+
+
+def test_runs_of_different_durations():
+    buffer = filled_buffer([(1, 2), (2, 2), (3, 4), (4, 2)])
+
+    assert buffer.get_runs().tolist() == [[2, 2], [4, 1], [2, 1]]
+    assert buffer.get_duration() == 10
+
+
+def test_get_segment():
+    buffer = filled_buffer([(1, 2), (2, 2), (3, 4), (4, 2)])
+
+    expected = [(1, 0.0)] * 2 + [(2, 1.0)] * 2 + [(3, 2.0)] * 4 + [(4, 3.0)] * 2
+    assert [buffer.get_segment(position) for position in range(10)] == expected
+    # a step back restarts the search
+    assert buffer.get_segment(0.5) == (1, 0.0)
+    assert buffer.get_segment(9.5) == (4, 3.0)
+
+
+def test_get_segment_out_of_the_buffer():
+    buffer = filled_buffer([(1, 2)])
+
+    with pytest.raises(ValueError):
+        buffer.get_segment(2)
+    with pytest.raises(ValueError):
+        buffer.get_segment(-1)
+
+
+def test_get_segments():
+    buffer = filled_buffer([(1, 2), (2, 2), (3, 4)])
+
+    assert buffer.get_segments().tolist() == [[1, 2, 0], [2, 4, 1], [3, 8, 2]]
+    assert not buffer.get_segments().flags.writeable
+
+
+def test_get_qi_per_second():
+    buffer = filled_buffer([(1, 2), (2, 2), (3, 4), (4, 1)])
+
+    qi_per_second = buffer.get_qi_per_second()
+
+    assert qi_per_second.tolist() == [1, 1, 2, 2, 3, 3, 3, 3, 4]
+    assert qi_per_second.dtype == np.int32
+    assert not qi_per_second.flags.writeable
+
+
+def test_fractional_durations_agree_with_get_segment():
+    # 3.2 s segments, the run ends are not exact in binary
+    buffer = filled_buffer([(qi % 20, 3.2) for qi in range(50)] + [(7, 1.6), (8, 1.6)])
+
+    assert buffer.get_runs().tolist() == [[3.2, 50], [1.6, 2]]
+    assert len(buffer.get_qi_per_second()) == int(np.ceil(buffer.get_duration()))
+    assert buffer.get_qi_per_second().tolist() == [buffer.get_segment(s)[0] for s in range(len(buffer.get_qi_per_second()))]
+    assert buffer.get_segments()[:, 0].tolist() == [qi % 20 for qi in range(50)] + [7, 8]
+
+
+@pytest.mark.parametrize('qi, duration', [(-1, 1), (256, 1), (0, 0), (0, -1)])
+def test_invalid_segment(qi, duration):
+    buffer = PlaybackBuffer()
+
+    with pytest.raises(ValueError):
+        buffer.add_segment(qi, duration, 0.0)
+    assert len(buffer) == 0
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the Scheduler ordering and cancellation, on a virtual clock.
+"""
+
+import pytest
+
+from base.configuration_parser import ConfigurationParser
+from base.message import Message, MessageKind
+from base.scheduler import Scheduler
+from base.scheduler_event import SchedulerEvent
+from base.timer import Timer
+
+
+def virtual_scheduler():
+    timer = Timer(ConfigurationParser({'virtual_time': True}))
+    return Scheduler.create(timer), timer
+
+
+def event(name):
+    return SchedulerEvent(Message(MessageKind.SELF, name), 0, 0)
+
+
+def dispatch_all(scheduler):
+    names = []
+    while not scheduler.is_empty():
+        names.append(scheduler.get_event().get_msg().get_payload())
+    return names
+
+
+def test_create_is_apart_from_the_singleton():
+    scheduler, _ = virtual_scheduler()
+
+    assert scheduler is not Scheduler.create(scheduler.timer)
+
+
+def test_untimed_events_are_fifo():
+    scheduler, _ = virtual_scheduler()
+
+    for name in 'abc':
+        scheduler.add_event(event(name))
+
+    assert len(scheduler) == 3
+    assert dispatch_all(scheduler) == list('abc')
+
+
+def test_timed_events_are_dispatched_by_timestamp():
+    scheduler, timer = virtual_scheduler()
+    times = []
+
+    scheduler.add_event(event('c'), 3)
+    scheduler.add_event(event('a'), 1)
+    scheduler.add_event(event('b'), 2)
+    while not scheduler.is_empty():
+        times.append((scheduler.get_event().get_msg().get_payload(), timer.perf_counter()))
+
+    assert times == [('a', 1), ('b', 2), ('c', 3)]
+
+
+def test_events_due_at_the_same_time_keep_the_insertion_order():
+    scheduler, timer = virtual_scheduler()
+
+    scheduler.add_event(event('a'), 0)
+    scheduler.add_event(event('b'))
+    scheduler.add_event(event('c'), 0)
+    scheduler.add_event(event('d'))
+
+    assert dispatch_all(scheduler) == list('abcd')
+
+
+def test_untimed_event_goes_before_a_future_event():
+    scheduler, timer = virtual_scheduler()
+
+    scheduler.add_event(event('later'), 5)
+    scheduler.add_event(event('now'))
+
+    assert dispatch_all(scheduler) == ['now', 'later']
+    assert timer.perf_counter() == 5
+
+
+def test_cancel_event():
+    scheduler, _ = virtual_scheduler()
+
+    a = scheduler.add_event(event('a'))
+    b = scheduler.add_event(event('b'), 1)
+    scheduler.add_event(event('c'), 2)
+
+    assert scheduler.cancel_event(a)
+    assert scheduler.cancel_event(b)
+    assert not scheduler.cancel_event(b)
+    assert len(scheduler) == 1
+    assert scheduler.get_next_event_time() == 2
+    assert dispatch_all(scheduler) == ['c']
+
+
+def test_cancel_a_dispatched_event():
+    scheduler, _ = virtual_scheduler()
+
+    a = scheduler.add_event(event('a'))
+    scheduler.get_event()
+
+    assert not scheduler.cancel_event(a)
+    assert scheduler.is_empty()
+
+
+def test_get_event_from_an_empty_scheduler():
+    scheduler, _ = virtual_scheduler()
+    scheduler.cancel_event(scheduler.add_event(event('a')))
+
+    assert scheduler.get_next_event_time() is None
+    with pytest.raises(IndexError):
+        scheduler.get_event()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the session record and of the session log file.
+"""
+
+import numpy as np
+import pytest
+
+from base.configuration_parser import ConfigurationParser
+from base.message import Message, MessageKind, SSMessage
+from base.scheduler_event import SchedulerEvent
+from base.session_log import SessionLog, SessionRecorder
+from base.timer import Timer
+
+CONFIGURATION = {'virtual_time': True, 'r2a_algorithm': 'R2A_FDASH'}
+
+
+def segment_response(segment_id, quality_id, bit_length, found=True):
+    msg = SSMessage(MessageKind.SEGMENT_RESPONSE)
+    msg.add_segment_id(segment_id)
+    msg.add_quality_id(quality_id)
+    msg.add_bit_length(bit_length)
+    msg.set_found(found)
+    return SchedulerEvent(msg, 2, 0)
+
+
+def record_session(path):
+    timer = Timer(ConfigurationParser(CONFIGURATION))
+    recorder = SessionRecorder(path, CONFIGURATION, timer)
+
+    recorder.record(SchedulerEvent(Message(MessageKind.XML_RESPONSE, '<MPD/>'), 2, 0))
+    for segment_id, quality_id in enumerate([3, 3, 5, 4], 1):
+        timer.sleep(1)
+        recorder.record(segment_response(segment_id, quality_id, 8000 * quality_id))
+    timer.sleep(1)
+    recorder.record(segment_response(5, 4, 0, found=False))
+
+    # every segment body received in two chunks of 0.5 s
+    download_samples = np.array([[time + offset, 500 * quality_id]
+                                 for time, quality_id in enumerate([3, 3, 5, 4])
+                                 for offset in (0.5, 1.0)])
+    recorder.save(download_samples)
+
+
+def test_record_save_and_load(tmp_path):
+    path = str(tmp_path / 'session.log')
+    record_session(path)
+
+    log = SessionLog.load(path)
+
+    assert log.configuration == CONFIGURATION
+    assert log.mpd == '<MPD/>'
+    assert len(log.events) == 6
+    assert log.events['time'].tolist() == [0, 1, 2, 3, 4, 5]
+    assert log.events['kind'][0] == MessageKind.XML_RESPONSE.value
+    assert log.get_segments()['segment_id'].tolist() == [1, 2, 3, 4, 5]
+    assert len(log.samples) == 8
+    # no temporary file is left aside
+    assert [p.name for p in tmp_path.iterdir()] == ['session.log']
+
+
+def test_summary(tmp_path):
+    path = str(tmp_path / 'session.log')
+    record_session(path)
+
+    summary = SessionLog.load(path).get_summary()
+
+    assert summary == {
+        'r2a_algorithm': 'R2A_FDASH',
+        'segments': 4,
+        'average_quality_id': 3.75,
+        'switches': 2,
+        'downloaded_bits': 8000 * 15,
+        'duration': 5.0,
+    }
+
+
+def test_trace(tmp_path):
+    path = str(tmp_path / 'session.log')
+    record_session(path)
+
+    trace = SessionLog.load(path).get_trace(step=0.5)
+
+    # 500 * qi bytes every 0.5 s
+    assert len(trace) > 0
+    assert np.max(trace) == pytest.approx(8 * 500 * 5 / 0.5)
+
+
+def test_load_a_file_that_is_not_a_log(tmp_path):
+    path = tmp_path / 'session.log'
+    path.write_bytes(b'x' * 64)
+
+    with pytest.raises(ValueError):
+        SessionLog.load(str(path))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+@description: PyDash Project
+
+Tests of the virtual time mode of the Timer.
+"""
+
+import pytest
+
+from base.configuration_parser import ConfigurationParser
+from base.timer import Timer
+
+
+def virtual_timer():
+    return Timer(ConfigurationParser({'virtual_time': True}))
+
+
+def test_virtual_clock_starts_at_zero():
+    timer = virtual_timer()
+
+    assert timer.is_virtual()
+    assert timer.perf_counter() == 0.0
+    assert timer.get_current_time() == 0.0
+
+
+def test_sleep_advances_the_clock():
+    timer = virtual_timer()
+
+    timer.sleep(1.5)
+    timer.sleep(-1)
+
+    assert timer.get_current_time() == 1.5
+
+
+def test_callbacks_run_in_deadline_order():
+    timer = virtual_timer()
+    calls = []
+
+    timer.call_later(3, lambda: calls.append(('c', timer.perf_counter())))
+    timer.call_later(1, lambda: calls.append(('a', timer.perf_counter())))
+    timer.call_later(2, lambda: calls.append(('b', timer.perf_counter())))
+    timer.advance_to(2.5)
+
+    assert calls == [('a', 1), ('b', 2)]
+    assert timer.perf_counter() == 2.5
+    assert timer.has_pending_callbacks()
+
+
+def test_callbacks_with_the_same_deadline_run_in_registration_order():
+    timer = virtual_timer()
+    calls = []
+
+    for name in 'abcd':
+        timer.call_later(1, lambda name=name: calls.append(name))
+    timer.advance_to(1)
+
+    assert calls == list('abcd')
+
+
+def test_callback_registered_by_a_callback_runs_in_the_same_advance():
+    timer = virtual_timer()
+    calls = []
+
+    timer.call_later(1, lambda: timer.call_later(1, lambda: calls.append(timer.perf_counter())))
+    timer.advance_to(5)
+
+    assert calls == [2]
+    assert not timer.has_pending_callbacks()
+
+
+def test_advance_to_never_moves_the_clock_back():
+    timer = virtual_timer()
+
+    timer.advance_to(3)
+    timer.advance_to(1)
+
+    assert timer.perf_counter() == 3
+
+
+def test_run_next_callback():
+    timer = virtual_timer()
+    calls = []
+
+    assert not timer.run_next_callback()
+
+    timer.call_later(2, lambda: calls.append('a'))
+    timer.call_later(4, lambda: calls.append('b'))
+
+    assert timer.run_next_callback()
+    assert calls == ['a']
+    assert timer.perf_counter() == 2
+
+
+def test_call_later_needs_the_virtual_time_mode():
+    timer = Timer(ConfigurationParser({'virtual_time': False}))
+
+    with pytest.raises(ValueError):
+        timer.call_later(1, lambda: None)